@@ -0,0 +1,31 @@
+from django.contrib import admin, messages
+from django.utils.translation import (
+    gettext_lazy as _,
+    ngettext,
+)
+
+from pictures.models import PictureField
+
+__all__ = ["process_pictures"]
+
+
+@admin.action(description=_("Process pictures of selected objects"))
+def process_pictures(modeladmin, request, queryset):
+    """Create all pictures for the selected objects in batches."""
+    # imported on first use, to not import the task queue on admin autodiscovery
+    from pictures import tasks
+
+    count = 0
+    for field in queryset.model._meta.get_fields():
+        if isinstance(field, PictureField):
+            count += tasks.process_many(queryset, field.name)
+    modeladmin.message_user(
+        request,
+        ngettext(
+            "%(count)d picture file is being processed.",
+            "%(count)d picture files are being processed.",
+            count,
+        )
+        % {"count": count},
+        messages.SUCCESS,
+    )
@@ -6,3 +6,4 @@ class PicturesAppConfig(AppConfig):
 
     def ready(self):
         import pictures.checks  # noqa
+        import pictures.metrics  # noqa
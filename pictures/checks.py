@@ -1,9 +1,23 @@
+from django.apps import apps
+from django.conf import settings
 from django.core.checks import Error, Tags, register
+from django.core.files.storage import InvalidStorageError
 from django.urls import NoReverseMatch, reverse
+from django.utils.encoding import filepath_to_uri
+from django.utils.module_loading import import_string
 
-from . import conf
+from . import conf, utils
 
-__all__ = ["placeholder_url_check"]
+__all__ = [
+    "placeholder_url_check",
+    "url_template_check",
+    "state_cache_check",
+    "task_deadline_check",
+    "queue_check",
+]
+
+#: Cache backends, whose entries are only visible to the process that wrote them.
+LOCAL_CACHE_BACKENDS = {"django.core.cache.backends.locmem.LocMemCache"}
 
 
 @register(Tags.urls)
@@ -32,3 +46,166 @@ def placeholder_url_check(app_configs, **kwargs):
                 )
             )
     return errors
+
+
+@register(Tags.urls)
+def url_template_check(app_configs, **kwargs):
+    from .models import PictureField
+
+    errors = []
+    if not conf.app_settings.URL_TEMPLATE:
+        return errors
+    sample_name = "pictures/sample image/800w.avif"
+    storages = []
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, PictureField) and field.storage not in storages:
+                storages.append(field.storage)
+    for storage in storages:
+        try:
+            template = utils.url_template(storage)
+        except InvalidStorageError as e:
+            errors.append(
+                Error(
+                    "The picture URL template is not configured correctly.",
+                    hint=f'PICTURES["URL_TEMPLATE"] references an unknown storage: {e}',
+                    id="pictures.E002",
+                )
+            )
+            break
+        if not template:
+            continue
+        url = template.format(name=filepath_to_uri(sample_name))
+        expected_url = storage.url(sample_name)
+        if url != expected_url:
+            errors.append(
+                Error(
+                    "The picture URL template does not match the storage URL.",
+                    hint=(
+                        f'PICTURES["URL_TEMPLATE"] returns {url!r},'
+                        f" but {storage.__class__.__qualname__}.url returns"
+                        f" {expected_url!r}."
+                    ),
+                    id="pictures.E002",
+                )
+            )
+    return errors
+
+
+@register(Tags.caches)
+def state_cache_check(app_configs, **kwargs):
+    errors = []
+    if not (alias := conf.app_settings.STATE_CACHE):
+        return errors
+    try:
+        backend = settings.CACHES[alias]["BACKEND"]
+    except KeyError:
+        return [
+            Error(
+                "The picture state cache is not configured correctly.",
+                hint=f'PICTURES["STATE_CACHE"] references an unknown cache: {alias!r}',
+                id="pictures.E003",
+            )
+        ]
+    # the task queue is only imported, if the state is tracked
+    from . import tasks
+
+    # pictures processed by a broker are completed in another process
+    processor = import_string(conf.app_settings.PROCESSOR)
+    in_process = processor in {
+        tasks._process_picture,
+        tasks.threaded_process_picture,
+        tasks.noop,
+    }
+    if backend in LOCAL_CACHE_BACKENDS and not in_process:
+        errors.append(
+            Error(
+                "The picture state cache is not shared with your workers.",
+                hint=(
+                    f'PICTURES["STATE_CACHE"] uses {backend}, which is local to each'
+                    " process. Use a cache shared between your web and worker"
+                    " processes, e.g. Redis or Memcached."
+                ),
+                id="pictures.E003",
+            )
+        )
+    return errors
+
+
+@register(Tags.caches)
+def task_deadline_check(app_configs, **kwargs):
+    errors = []
+    if conf.app_settings.TASK_DEADLINE and not conf.app_settings.STATE_CACHE:
+        errors.append(
+            Error(
+                "Pictures skipped by the task deadline can't be tracked.",
+                hint=(
+                    'PICTURES["TASK_DEADLINE"] is set, but PICTURES["STATE_CACHE"]'
+                    " is not, skipped pictures would be rendered."
+                ),
+                id="pictures.E004",
+            )
+        )
+    return errors
+
+
+def _get_queue_names() -> set[str]:
+    """Return the names of all queues, besides the QUEUE_NAME, pictures are sent to."""
+    from .models import PictureField
+
+    settings = conf.app_settings
+    queue_names = {
+        settings.PRIORITY_QUEUE_NAME,
+        settings.DEFERRED_QUEUE_NAME,
+        *settings.SIZE_QUEUES,
+    }
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, PictureField):
+                queue_names.add(field.queue_name)
+    queue_names.discard(None)
+    return queue_names
+
+
+@register()
+def queue_check(app_configs, **kwargs):
+    errors = []
+    if not (queue_names := _get_queue_names()):
+        return errors
+    # the task queue is only imported, if additional queues are configured
+    from . import tasks
+
+    processor = conf.app_settings.PROCESSOR
+    try:
+        if processor == f"{tasks.__name__}.process_picture":
+            integration = tasks._get_default_integration()
+        else:
+            integration = tasks._get_integration(processor)
+    except ImportError:
+        return errors
+    if integration is None:
+        return errors
+    queue_names.add(conf.app_settings.QUEUE_NAME)
+    if integration.__name__ == "pictures.contrib.django_rq":
+        setting = "RQ_QUEUES"
+        configured = getattr(settings, "RQ_QUEUES", {})
+    elif integration.__name__ == "pictures.contrib.django_tasks":
+        backend = conf.app_settings.BACKEND
+        setting = f"TASKS[{backend!r}]['QUEUES']"
+        # Django's tasks framework accepts any queue, if QUEUES is empty
+        if not (
+            configured := settings.TASKS.get(backend, {}).get("QUEUES", ["default"])
+        ):
+            return errors
+    else:
+        # Celery and Dramatiq create queues on demand
+        return errors
+    for queue_name in sorted(queue_names - set(configured)):
+        errors.append(
+            Error(
+                "A picture queue is not configured for your task queue.",
+                hint=f"Add the {queue_name!r} queue to your {setting} setting.",
+                id="pictures.E005",
+            )
+        )
+    return errors
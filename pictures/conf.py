@@ -24,19 +24,52 @@ def get_settings():
             "FILE_TYPES": ["AVIF"],
             "PIXEL_DENSITIES": [1, 2],
             "USE_PLACEHOLDERS": django_settings.DEBUG,
+            "URL_TEMPLATE": None,
+            "URL_CACHE_TIMEOUT": None,
+            "URL_CACHE": None,
             "QUEUE_NAME": "pictures",
+            "PRIORITY_QUEUE_NAME": None,
+            "DEFERRED_QUEUE_NAME": None,
+            "SIZE_QUEUES": {},
+            "FAN_OUT": None,
+            "FAN_OUT_WIDTHS": [400, 1200],
             "BACKEND": "default",
+            "CACHE": "default",
+            "STATE_CACHE": None,
+            "DIMENSION_CACHE": None,
+            "UPDATE_DIMENSIONS_ON_INIT": True,
+            "RETRIES": 0,
+            "RETRY_BACKOFF": 1,
+            "CHECKPOINT_TIMEOUT": 60 * 60 * 24,
+            "PENDING_TIMEOUT": 60 * 60,
+            "STATE_TIMEOUT": 60 * 60 * 24 * 30,
+            "MISSING_TIMEOUT": 60,
+            "TASK_DEADLINE": None,
+            "PICTURE_DEADLINE": None,
+            "TRACER": None,
+            "PROFILE_THRESHOLD": None,
+            "PROFILE_DIR": None,
             "PICTURE_CLASS": "pictures.models.PillowPicture",
             "PROCESSOR": "pictures.tasks.process_picture",
+            "BATCH_PROCESSOR": "pictures.tasks.process_pictures",
+            "BATCH_SIZE": 100,
+            "THREAD_POOL_SIZE": 2,
+            "THREAD_QUEUE_SIZE": 100,
             **getattr(django_settings, "PICTURES", {}),
         },
     )
 
 
+#: Incremented whenever the settings are reset, to invalidate derived values.
+generation = 0
+
+
 class LazySettings(SimpleLazyObject):
     def _reset(self, *, setting="PICTURES", **kwargs):
+        global generation
         if setting in {"PICTURES", "DEBUG"}:
             self._wrapped = empty
+            generation += 1
 
 
 app_settings = LazySettings(get_settings)
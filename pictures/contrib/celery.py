@@ -0,0 +1,84 @@
+"""Process pictures with Celery."""
+
+from __future__ import annotations
+
+import warnings
+
+import django
+from celery import shared_task
+from django.db import transaction
+
+from pictures import conf
+from pictures.tasks import (
+    PERMANENT_ERRORS,
+    _dispatch,
+    _process_picture,
+    _process_pictures,
+)
+
+__all__ = [
+    "process_picture_with_celery",
+    "celery_process_picture",
+    "process_pictures_with_celery",
+    "celery_process_pictures",
+]
+
+
+# Task names are pinned to their former module, for messages already in flight.
+@shared_task(
+    name="pictures.tasks.process_picture_with_celery",
+    ignore_results=True,
+    autoretry_for=(OSError,),
+    dont_autoretry_for=PERMANENT_ERRORS,
+    retry_backoff=True,
+)
+def process_picture_with_celery(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+) -> None:
+    _process_picture(storage, file_name, new, old)
+
+
+def _enqueue_with_celery(queue_name: str, **kwargs) -> None:
+    process_picture_with_celery.apply_async(kwargs=kwargs, queue=queue_name)
+
+
+def celery_process_picture(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+    **options,
+) -> None:
+    if django.VERSION >= (6, 0):
+        warnings.warn(
+            "The picture processor 'celery_process_picture' is deprecated in favor of Django's tasks framework."
+            " Deletion is scheduled with the expiration of Django 5.2 LTS version support.",
+            PendingDeprecationWarning,
+            stacklevel=2,
+        )
+    _dispatch(_enqueue_with_celery, storage, file_name, new, old, **options)
+
+
+@shared_task(
+    name="pictures.tasks.process_pictures_with_celery",
+    ignore_results=True,
+    retry_backoff=True,
+)
+def process_pictures_with_celery(batch) -> None:
+    _process_pictures(batch)
+
+
+def celery_process_pictures(batch, queue_name: str | None = None) -> None:
+    transaction.on_commit(
+        lambda: process_pictures_with_celery.apply_async(
+            kwargs=dict(batch=batch),
+            queue=queue_name or conf.app_settings.QUEUE_NAME,
+        )
+    )
+
+
+process_picture = celery_process_picture
+process_pictures = celery_process_pictures
@@ -0,0 +1,67 @@
+"""Process pictures with Django-RQ."""
+
+from __future__ import annotations
+
+import warnings
+
+import django
+from django.db import transaction
+from django_rq import get_queue, job
+
+from pictures import conf
+from pictures.tasks import _dispatch, _process_picture, _process_pictures
+
+__all__ = [
+    "process_picture_with_django_rq",
+    "rq_process_picture",
+    "process_pictures_with_django_rq",
+    "rq_process_pictures",
+]
+
+
+@job(conf.app_settings.QUEUE_NAME)
+def process_picture_with_django_rq(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+) -> None:
+    _process_picture(storage, file_name, new, old)
+
+
+def _enqueue_with_django_rq(queue_name: str, **kwargs) -> None:
+    get_queue(queue_name).enqueue(process_picture_with_django_rq, **kwargs)
+
+
+def rq_process_picture(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+    **options,
+) -> None:
+    if django.VERSION >= (6, 0):
+        warnings.warn(
+            "The picture processor 'rq_process_picture' is deprecated in favor of Django's tasks framework."
+            " Deletion is scheduled with the expiration of Django 5.2 LTS version support.",
+            PendingDeprecationWarning,
+            stacklevel=2,
+        )
+    _dispatch(_enqueue_with_django_rq, storage, file_name, new, old, **options)
+
+
+@job(conf.app_settings.QUEUE_NAME)
+def process_pictures_with_django_rq(batch) -> None:
+    _process_pictures(batch)
+
+
+def rq_process_pictures(batch, queue_name: str | None = None) -> None:
+    transaction.on_commit(
+        lambda: get_queue(queue_name or conf.app_settings.QUEUE_NAME).enqueue(
+            process_pictures_with_django_rq, batch=batch
+        )
+    )
+
+
+process_picture = rq_process_picture
+process_pictures = rq_process_pictures
@@ -0,0 +1,70 @@
+"""Process pictures with Django's tasks framework."""
+
+from __future__ import annotations
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.tasks import exceptions, task
+
+from pictures import conf
+from pictures.tasks import _dispatch, _process_picture, _process_pictures
+
+__all__ = [
+    "process_picture_with_django_tasks",
+    "process_picture",
+    "process_pictures_with_django_tasks",
+    "process_pictures",
+]
+
+try:
+
+    @task(
+        backend=conf.app_settings.BACKEND,
+        queue_name=conf.app_settings.QUEUE_NAME,
+    )
+    def process_picture_with_django_tasks(
+        storage: tuple[str, list, dict],
+        file_name: str,
+        new: list[tuple[str, list, dict]] | None = None,
+        old: list[tuple[str, list, dict]] | None = None,
+    ) -> None:
+        _process_picture(storage, file_name, new, old)
+
+    @task(
+        backend=conf.app_settings.BACKEND,
+        queue_name=conf.app_settings.QUEUE_NAME,
+    )
+    def process_pictures_with_django_tasks(batch) -> None:
+        _process_pictures(batch)
+
+except exceptions.InvalidTask as e:
+    if conf.app_settings.PROCESSOR == "pictures.tasks.process_picture":
+        raise ImproperlyConfigured(
+            "Pictures are processed on a separate queue by default,"
+            " please update the 'TASKS' setting in accordance with Django-Pictures documentation."
+            " If you need to continue to use a deprecated processor, please set the 'PROCESSOR' to another processor."
+        ) from e
+    # fall back to the next available integration
+    raise ImportError(str(e)) from e
+
+
+def _enqueue_with_django_tasks(queue_name: str, **kwargs) -> None:
+    process_picture_with_django_tasks.using(queue_name=queue_name).enqueue(**kwargs)
+
+
+def process_picture(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+    **options,
+) -> None:
+    _dispatch(_enqueue_with_django_tasks, storage, file_name, new, old, **options)
+
+
+def process_pictures(batch, queue_name: str | None = None) -> None:
+    transaction.on_commit(
+        lambda: process_pictures_with_django_tasks.using(
+            queue_name=queue_name or conf.app_settings.QUEUE_NAME
+        ).enqueue(batch=batch)
+    )
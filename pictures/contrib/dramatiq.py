@@ -0,0 +1,95 @@
+"""Process pictures with Dramatiq."""
+
+from __future__ import annotations
+
+import warnings
+
+import django
+from django.db import transaction
+from dramatiq import actor
+
+from pictures import conf
+from pictures.tasks import _dispatch, _process_picture, _process_pictures
+
+__all__ = [
+    "process_picture_with_dramatiq",
+    "dramatiq_process_picture",
+    "process_pictures_with_dramatiq",
+    "dramatiq_process_pictures",
+]
+
+
+@actor(queue_name=conf.app_settings.QUEUE_NAME)
+def process_picture_with_dramatiq(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+) -> None:
+    _process_picture(storage, file_name, new, old)
+
+
+def _declare_queues() -> None:
+    """Declare all configured queues, workers only consume declared queues."""
+    settings = conf.app_settings
+    for queue_name in (
+        settings.PRIORITY_QUEUE_NAME,
+        settings.DEFERRED_QUEUE_NAME,
+        *settings.SIZE_QUEUES,
+    ):
+        if queue_name:
+            process_picture_with_dramatiq.broker.declare_queue(queue_name)
+
+
+def _enqueue_with_dramatiq(queue_name: str, **kwargs) -> None:
+    broker = process_picture_with_dramatiq.broker
+    # a field's queue name may not have been configured globally
+    broker.declare_queue(queue_name)
+    broker.enqueue(
+        process_picture_with_dramatiq.message_with_options(kwargs=kwargs).copy(
+            queue_name=queue_name
+        )
+    )
+
+
+def dramatiq_process_picture(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+    **options,
+) -> None:
+    if django.VERSION >= (6, 0):
+        warnings.warn(
+            "The picture processor 'dramatiq_process_picture' is deprecated in favor of Django's tasks framework."
+            " Deletion is scheduled with the expiration of Django 5.2 LTS version support.",
+            PendingDeprecationWarning,
+            stacklevel=2,
+        )
+    _dispatch(_enqueue_with_dramatiq, storage, file_name, new, old, **options)
+
+
+@actor(queue_name=conf.app_settings.QUEUE_NAME)
+def process_pictures_with_dramatiq(batch) -> None:
+    _process_pictures(batch)
+
+
+def dramatiq_process_pictures(batch, queue_name: str | None = None) -> None:
+    queue_name = queue_name or conf.app_settings.QUEUE_NAME
+
+    def enqueue():
+        broker = process_pictures_with_dramatiq.broker
+        broker.declare_queue(queue_name)
+        broker.enqueue(
+            process_pictures_with_dramatiq.message_with_options(
+                kwargs=dict(batch=batch)
+            ).copy(queue_name=queue_name)
+        )
+
+    transaction.on_commit(enqueue)
+
+
+_declare_queues()
+
+process_picture = dramatiq_process_picture
+process_pictures = dramatiq_process_pictures
@@ -1,17 +1,20 @@
 import json
+from collections.abc import Mapping
 
 from django.http import QueryDict
 from rest_framework import serializers
 
 __all__ = ["PictureField"]
 
-from pictures import utils
+from pictures import url_cache
 from pictures.models import Picture, PictureFieldFile
 
 
 def default(obj):
     if isinstance(obj, Picture):
         return obj.url
+    if isinstance(obj, Mapping):
+        return dict(obj)
     raise TypeError(f"Type '{type(obj).__name__}' not serializable")
 
 
@@ -23,6 +26,7 @@ class PictureField(serializers.ReadOnlyField):
         self.aspect_ratios = aspect_ratios or []
         self.file_types = file_types or []
 
+    @url_cache.batch()
     def to_representation(self, obj: PictureFieldFile):
         if not obj:
             return None
@@ -62,6 +66,9 @@ class PictureField(serializers.ReadOnlyField):
                     f"Invalid ratios: {', '.join(ratios)}. Choices are: {', '.join(filter(None, obj.aspect_ratios.keys()))}"
                 )
 
+        # only include file types, once their pictures have been processed
+        ready_file_types = obj.get_ready_file_types()
+        media = field.spec.get_sizes(container, **breakpoints)
         payload = {
             **base_payload,
             "ratios": {
@@ -69,11 +76,10 @@ class PictureField(serializers.ReadOnlyField):
                     "sources": {
                         f"image/{file_type.lower()}": sizes
                         for file_type, sizes in sources.items()
-                        if file_type in self.file_types or not self.file_types
+                        if file_type in ready_file_types
+                        and (file_type in self.file_types or not self.file_types)
                     },
-                    "media": utils.sizes(
-                        field=field, container_width=container, **breakpoints
-                    ),
+                    "media": media,
                 }
                 for ratio, sources in obj.aspect_ratios.items()
                 if ratio in ratios or not ratios
@@ -0,0 +1,25 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from pictures.models import PictureField
+
+
+class PictureFieldCommand(BaseCommand):
+    """Base command for commands that operate on a single picture field."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "field",
+            help="Picture field in the format 'app_label.Model.field'.",
+        )
+
+    @staticmethod
+    def get_field(label: str) -> PictureField:
+        try:
+            app_label, model_name, field_name = label.split(".")
+            field = apps.get_model(app_label, model_name)._meta.get_field(field_name)
+        except (ValueError, LookupError) as e:
+            raise CommandError(f"Invalid field: {label}") from e
+        if not isinstance(field, PictureField):
+            raise CommandError(f"Not a picture field: {label}")
+        return field
@@ -0,0 +1,107 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import CommandError
+from django.db.models import Q
+
+from pictures import conf, probe, state
+
+from ._base import PictureFieldCommand
+
+
+class Command(PictureFieldCommand):
+    help = (
+        "Populate the width and height fields of a picture field,"
+        " probing the source files concurrently."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of rows per query and bulk update.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Number of source files probed concurrently.",
+        )
+        parser.add_argument(
+            "--start-after",
+            default=None,
+            help="Resume after the given primary key.",
+        )
+
+    def handle(self, *args, field, batch_size, threads, start_after, **options):
+        field = self.get_field(field)
+        if not (field.width_field and field.height_field):
+            raise CommandError(
+                f"The picture field {field} has no width_field and height_field."
+            )
+        batch_size = batch_size or conf.app_settings.BATCH_SIZE
+        model = field.model
+        # rows with dimensions are skipped, which makes the command resumable
+        queryset = (
+            model._default_manager
+            .exclude(Q(**{field.name: ""}) | Q(**{field.name: None}))
+            .filter(
+                Q(**{f"{field.width_field}__isnull": True})
+                | Q(**{f"{field.height_field}__isnull": True})
+            )
+            .order_by("pk")
+        )
+        last_pk = start_after
+        updated = failed = 0
+        started = time.monotonic()
+        with ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="pictures"
+        ) as executor:
+            while rows := list(
+                # no model instances, loading them could read the files
+                (
+                    queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                ).values_list("pk", field.name)[:batch_size]
+            ):
+                objs = []
+                for (pk, file_name), dimensions in zip(
+                    rows,
+                    executor.map(
+                        lambda row: self.get_dimensions(field.storage, row[1]), rows
+                    ),
+                ):
+                    if dimensions is None:
+                        failed += 1
+                        continue
+                    obj = model(pk=pk)
+                    setattr(obj, field.width_field, dimensions[0])
+                    setattr(obj, field.height_field, dimensions[1])
+                    objs.append(obj)
+                model._default_manager.bulk_update(
+                    objs, [field.width_field, field.height_field]
+                )
+                updated += len(objs)
+                last_pk = rows[-1][0]
+                self.stdout.write(
+                    f"Updated {updated} rows, {updated / (time.monotonic() - started):.1f}"
+                    f" rows/s, resume with --start-after={last_pk}"
+                )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated {updated} rows in {time.monotonic() - started:.1f}s."
+            )
+        )
+        if failed:
+            self.stderr.write(f"Failed to read {failed} files.")
+
+    def get_dimensions(self, storage, file_name: str) -> tuple[int, int] | None:
+        if dimensions := state.get_dimensions(storage.deconstruct(), file_name):
+            return dimensions
+        try:
+            with storage.open(file_name) as fs:
+                return probe.dimensions(fs)
+        except Exception as e:
+            self.stderr.write(f"Failed to read {file_name!r}: {e}")
+            return None
@@ -0,0 +1,10 @@
+from django.core.management import BaseCommand
+
+from pictures import metrics
+
+
+class Command(BaseCommand):
+    help = "Print the metrics of this process in Prometheus' text format."
+
+    def handle(self, *args, **options):
+        self.stdout.write(metrics.REGISTRY.expose(), ending="")
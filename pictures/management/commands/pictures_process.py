@@ -0,0 +1,25 @@
+from pictures import tasks
+
+from ._base import PictureFieldCommand
+
+
+class Command(PictureFieldCommand):
+    help = "Create all pictures of a picture field, sending one task per batch."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of source files per task.",
+        )
+
+    def handle(self, *args, field, batch_size, **options):
+        field = self.get_field(field)
+        count = tasks.process_many(
+            field.model._default_manager.all(),
+            field.name,
+            batch_size=batch_size,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Processing {count} files."))
@@ -0,0 +1,262 @@
+"""
+In-process metrics for processing and rendering pictures.
+
+Metrics are exposed in Prometheus' text format, see also:
+https://prometheus.io/docs/instrumenting/exposition_formats/
+"""
+
+from __future__ import annotations
+
+import contextlib
+import math
+import threading
+import time
+from collections.abc import Iterator
+
+from django.dispatch import receiver
+
+from pictures import signals, utils
+
+__all__ = [
+    "Counter",
+    "Histogram",
+    "Callback",
+    "Registry",
+    "REGISTRY",
+]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            key,
+            str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"),
+        )
+        for key, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+class Metric:
+    type: str
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name!r} requires the labels: {', '.join(self.labelnames)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def collect(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield from self._samples(dict(zip(self.labelnames, key)), value)
+
+    def _samples(self, labels: dict, value) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """A monotonically increasing value, e.g. the number of processed tasks."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self, labels, value):
+        yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """A distribution of observed values, e.g. latencies in seconds."""
+
+    type = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ((0,) * len(self.buckets), 0))
+            self._values[key] = (
+                tuple(
+                    count + (value <= bound)
+                    for count, bound in zip(counts, self.buckets)
+                ),
+                total + value,
+            )
+
+    @contextlib.contextmanager
+    def measure(self, **labels):
+        """Observe the duration of a block or function in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def get_count(self, **labels) -> int:
+        counts, _ = self._values.get(self._key(labels), ((0,), 0))
+        return counts[-1]
+
+    def _samples(self, labels, value):
+        counts, total = value
+        for bound, count in zip(self.buckets, counts):
+            bucket_labels = labels | {"le": _format_value(bound)}
+            yield f"{self.name}_bucket{_format_labels(bucket_labels)} {_format_value(count)}"
+        yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+        yield f"{self.name}_count{_format_labels(labels)} {_format_value(counts[-1])}"
+
+
+class Callback(Metric):
+    """A value read on collection, e.g. the statistics of a cache."""
+
+    def __init__(self, name: str, documentation: str, callback, type="gauge"):
+        super().__init__(name, documentation)
+        self.callback = callback
+        self.type = type
+
+    def collect(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield f"{self.name} {_format_value(self.callback())}"
+
+
+class Registry:
+    """A collection of metrics, that are exposed together."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), **kwargs):
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def callback(self, name: str, documentation: str, callback, **kwargs) -> Callback:
+        return self.register(Callback(name, documentation, callback, **kwargs))
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def expose(self) -> str:
+        """Return all metrics in Prometheus' text format."""
+        return "".join(
+            f"{line}\n"
+            for metric in self._metrics.values()
+            for line in metric.collect()
+        )
+
+
+REGISTRY = Registry()
+
+tasks_processed = REGISTRY.counter(
+    "pictures_tasks_processed_total",
+    "Source files processed by a task.",
+)
+stage_duration = REGISTRY.histogram(
+    "pictures_stage_duration_seconds",
+    "Duration of successful processing stages.",
+    ["stage"],
+)
+failures = REGISTRY.counter(
+    "pictures_failures_total",
+    "Failed processing stages.",
+    ["stage"],
+)
+variants_created = REGISTRY.counter(
+    "pictures_variants_created_total",
+    "Pictures saved to storage.",
+    ["file_type"],
+)
+variants_deleted = REGISTRY.counter(
+    "pictures_variants_deleted_total",
+    "Pictures deleted from storage.",
+    ["file_type"],
+)
+bytes_written = REGISTRY.counter(
+    "pictures_bytes_written_total",
+    "Bytes of pictures saved to storage.",
+    ["file_type"],
+)
+template_renders = REGISTRY.histogram(
+    "pictures_template_render_seconds",
+    "Duration of template tag renders.",
+    ["tag"],
+)
+placeholder_renders = REGISTRY.histogram(
+    "pictures_placeholder_render_seconds",
+    "Duration of placeholder renders.",
+)
+
+REGISTRY.callback(
+    "pictures_source_set_cache_hits_total",
+    "Source sets read from the cache.",
+    lambda: utils.source_set.cache_info().hits,
+    type="counter",
+)
+REGISTRY.callback(
+    "pictures_source_set_cache_misses_total",
+    "Source sets computed, that weren't cached.",
+    lambda: utils.source_set.cache_info().misses,
+    type="counter",
+)
+REGISTRY.callback(
+    "pictures_source_set_cache_size",
+    "Source sets currently cached.",
+    lambda: utils.source_set.cache_info().currsize,
+)
+
+
+@receiver(signals.stage_processed)
+def record_stage(sender, stage, duration, exception, tags, **kwargs):
+    if exception is not None:
+        failures.inc(stage=stage)
+        return
+    stage_duration.observe(duration, stage=stage)
+    if stage == "process":
+        tasks_processed.inc()
+    elif stage == "write":
+        variants_created.inc(file_type=tags["file_type"])
+        bytes_written.inc(tags["bytes_written"], file_type=tags["file_type"])
+    elif stage == "delete":
+        variants_deleted.inc(file_type=tags["file_type"])
@@ -2,8 +2,11 @@ from __future__ import annotations
 
 import abc
 import dataclasses
+import functools
 import io
 import math
+import os
+from collections.abc import Iterator, Mapping
 from fractions import Fraction
 from pathlib import Path
 from types import NotImplementedType
@@ -11,21 +14,29 @@ from types import NotImplementedType
 from django.core import checks
 from django.core.files.base import ContentFile
 from django.core.files.storage import Storage
-from django.db.models import ImageField
+from django.db.models import ImageField, QuerySet
 from django.db.models.fields.files import ImageFieldFile
+from django.db.models.query import ModelIterable
 from django.urls import reverse
+from django.utils.encoding import filepath_to_uri
 from django.utils.module_loading import import_string
 from PIL import Image, ImageCms, ImageOps
 
-from pictures import conf, utils
+from pictures import conf, probe, signals, state, url_cache, utils
 
-__all__ = ["PictureField", "PictureFieldFile", "Picture"]
+__all__ = [
+    "PictureField",
+    "PictureFieldFile",
+    "Picture",
+    "PictureQuerySet",
+    "prefetch_pictures",
+]
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True, eq=False)
 class Picture(abc.ABC):
     """
-    An abstract picture class similar to Django's image class.
+    An abstract and immutable picture class similar to Django's image class.
 
     Subclasses will need to implement the `url` property.
     """
@@ -37,10 +48,15 @@ class Picture(abc.ABC):
     width: int
 
     def __post_init__(self):
-        self.aspect_ratio = Fraction(self.aspect_ratio) if self.aspect_ratio else None
+        if not isinstance(self.aspect_ratio, Fraction):
+            object.__setattr__(
+                self,
+                "aspect_ratio",
+                Fraction(self.aspect_ratio) if self.aspect_ratio else None,
+            )
 
     def __hash__(self):
-        return hash(self.url)
+        return hash((self.parent_name, self.file_type, self.aspect_ratio, self.width))
 
     def __eq__(self, other):
         if not isinstance(other, type(self)):
@@ -66,11 +82,43 @@ class Picture(abc.ABC):
         """Return the URL of the picture."""
 
 
+@dataclasses.dataclass(frozen=True, slots=True, eq=False)
 class PillowPicture(Picture):
     """Use the Pillow library to process images."""
 
+    _name: str = dataclasses.field(init=False, repr=False)
+    _url: tuple[int, str] | None = dataclasses.field(
+        init=False, default=None, repr=False
+    )
+
+    def __post_init__(self):
+        # zero-argument super() doesn't work with slotted dataclasses
+        Picture.__post_init__(self)
+        object.__setattr__(
+            self,
+            "_name",
+            os.path.join(
+                _picture_dir(self.parent_name, self.aspect_ratio),
+                f"{self.width}w.{self.file_type.lower()}",
+            ),
+        )
+
+    @property
+    def name(self) -> str:
+        return self._name
+
     @property
     def url(self) -> str:
+        # cached per settings generation, since placeholders depend on settings
+        if self._url is not None and self._url[0] == conf.generation:
+            return self._url[1]
+        url = self._get_url()
+        if not url_cache.is_signed(self.storage):
+            # signed URLs expire, they are cached by the URL cache instead
+            object.__setattr__(self, "_url", (conf.generation, url))
+        return url
+
+    def _get_url(self) -> str:
         if conf.app_settings.USE_PLACEHOLDERS:
             return reverse(
                 "pictures:placeholder",
@@ -85,6 +133,10 @@ class PillowPicture(Picture):
                     "file_type": self.file_type,
                 },
             )
+        if template := utils.url_template(self.storage):
+            return template.format(name=filepath_to_uri(self.name))
+        if conf.app_settings.URL_CACHE_TIMEOUT:
+            return url_cache.get_url(self.storage, self.parent_name, self.name)
         return self.storage.url(self.name)
 
     @property
@@ -93,13 +145,6 @@ class PillowPicture(Picture):
             return math.floor(self.width / self.aspect_ratio)
         return None
 
-    @property
-    def name(self) -> str:
-        path = Path(self.parent_name).with_suffix("")
-        if self.aspect_ratio:
-            path /= str(self.aspect_ratio).replace("/", "_")
-        return str(path / f"{self.width}w.{self.file_type.lower()}")
-
     @property
     def path(self) -> Path:
         return Path(self.storage.path(self.name))
@@ -139,15 +184,158 @@ class PillowPicture(Picture):
             image.thumbnail(size)
         return image
 
-    def save(self, image):
-        with io.BytesIO() as file_buffer:
+    def save(self, image, **params):
+        tags = {
+            "file_type": self.file_type,
+            "width": self.width,
+            "aspect_ratio": str(self.aspect_ratio) if self.aspect_ratio else None,
+            "source_pixels": image.width * image.height,
+        }
+        with signals.trace(type(self), "resize", **tags):
             img = self.resize(image)
-            img.save(file_buffer, format=self.file_type, exif=b"", icc_profile=b"")
+        with io.BytesIO() as file_buffer:
+            with signals.trace(type(self), "encode", **tags):
+                img.save(
+                    file_buffer,
+                    format=self.file_type,
+                    exif=b"",
+                    icc_profile=b"",
+                    **params,
+                )
+            content = ContentFile(file_buffer.getvalue())
+        with signals.trace(type(self), "write", bytes_written=content.size, **tags):
             self.storage.delete(self.name)  # avoid any filename collisions
-            self.storage.save(self.name, ContentFile(file_buffer.getvalue()))
+            self.storage.save(self.name, content)
 
     def delete(self):
-        self.storage.delete(self.name)
+        with signals.trace(type(self), "delete", file_type=self.file_type):
+            self.storage.delete(self.name)
+
+
+@functools.lru_cache(maxsize=1024)
+def _picture_dir(parent_name: str, aspect_ratio: Fraction | None) -> str:
+    # shared by all widths and file types, diffs create many pictures per source
+    path = Path(parent_name).with_suffix("")
+    if aspect_ratio:
+        path /= str(aspect_ratio).replace("/", "_")
+    return str(path)
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class PictureFieldSpec:
+    """
+    Options of a picture field, compiled from its attributes and settings.
+
+    Specs are immutable and replaced, whenever the field or settings change.
+    """
+
+    field: PictureField
+    generation: int
+    picture_class: type[Picture]
+    aspect_ratios: tuple[tuple[str | Fraction | None, Fraction | None], ...]
+    file_types: tuple[str, ...]
+    max_width: int
+    cols: int
+    pixel_densities: tuple[int, ...]
+    _sizes: dict = dataclasses.field(default_factory=dict, init=False, repr=False)
+    _diffs: dict = dataclasses.field(default_factory=dict, init=False, repr=False)
+
+    #: Maximum number of memoized sizes attributes, breakpoints may be user input.
+    max_sizes = 128
+    #: Maximum number of memoized diffs, one per spec and source sizes compared.
+    max_diffs = 1024
+
+    @classmethod
+    def compile(cls, field: PictureField) -> PictureFieldSpec:
+        return cls(
+            field=field,
+            generation=conf.generation,
+            picture_class=import_string(conf.app_settings.PICTURE_CLASS),
+            aspect_ratios=tuple(
+                (ratio, Fraction(ratio) if ratio else None)
+                for ratio in field.aspect_ratios
+            ),
+            file_types=tuple(field.file_types),
+            max_width=field.container_width,
+            cols=field.grid_columns,
+            pixel_densities=tuple(conf.app_settings.PIXEL_DENSITIES),
+        )
+
+    @functools.cached_property
+    def processor(self):
+        # resolved on first use, to avoid importing task queues during rendering
+        return import_string(conf.app_settings.PROCESSOR)
+
+    @functools.cached_property
+    def sizes(self) -> str:
+        """Return the sizes attribute for the default breakpoints and container."""
+        return utils.sizes(field=self.field, container_width=self.field.container_width)
+
+    def get_sizes(self, container_width: int, **breakpoints: int) -> str:
+        """Return the sizes attribute for the given container and breakpoints."""
+        if not breakpoints and container_width == self.max_width:
+            return self.sizes
+        key = container_width, tuple(sorted(breakpoints.items()))
+        try:
+            return self._sizes[key]
+        except KeyError:
+            pass
+        sizes = utils.sizes(
+            field=self.field, container_width=container_width, **breakpoints
+        )
+        if len(self._sizes) < self.max_sizes:
+            self._sizes[key] = sizes
+        return sizes
+
+    def variants(
+        self, size: tuple[int, int]
+    ) -> Iterator[tuple[Fraction | None, str, int]]:
+        """
+        Yield the aspect ratio, file type and width of all pictures of a source size.
+
+        Together with the source file name, they determine the picture names.
+        """
+        for _, fraction in self.aspect_ratios:
+            widths = self.source_set(size, fraction)
+            for file_type in self.file_types:
+                for width in widths:
+                    yield fraction, file_type, width
+
+    def diff(
+        self,
+        other: PictureFieldSpec,
+        size: tuple[int, int],
+        other_size: tuple[int, int],
+    ) -> tuple[list, list]:
+        """Return the new and obsolete variants, compared to another spec."""
+        key = other, size, other_size
+        # memoized, since migrations compare the same specs for every row
+        try:
+            return self._diffs[key]
+        except KeyError:
+            pass
+        new = dict.fromkeys(self.variants(size))
+        obsolete = []
+        for variant in dict.fromkeys(other.variants(other_size)):
+            if variant in new:
+                del new[variant]
+            else:
+                obsolete.append(variant)
+        diff = list(new), obsolete
+        if len(self._diffs) < self.max_diffs:
+            self._diffs[key] = diff
+        return diff
+
+    def source_set(
+        self, size: tuple[int, int], ratio: Fraction | None
+    ) -> tuple[int, ...]:
+        return utils._source_set(
+            size,
+            (ratio.numerator, ratio.denominator) if ratio else None,
+            self.max_width,
+            self.cols,
+            self.pixel_densities,
+        )
 
 
 class PictureFieldFile(ImageFieldFile):
@@ -155,13 +343,40 @@ class PictureFieldFile(ImageFieldFile):
         """Return the new and obsolete :class:`Picture` instances."""
         if not isinstance(other, PictureFieldFile):
             return NotImplemented
-        new = self.get_picture_files_list() - other.get_picture_files_list()
-        obsolete = other.get_picture_files_list() - self.get_picture_files_list()
+        new, obsolete = self._diff(other)
+        return set(new), set(obsolete)
+
+    def _diff(self, other: PictureFieldFile) -> tuple[list[Picture], list[Picture]]:
+        if self.name != other.name or (
+            self.storage is not other.storage
+            and self.storage.deconstruct() != other.storage.deconstruct()
+        ):
+            # different source files have no pictures in common
+            return (
+                list(self.get_picture_files_list()),
+                list(other.get_picture_files_list()),
+            )
+        # compare picture names, instead of instances, and only create changed ones
+        new, obsolete = self.field.spec.diff(
+            other.field.spec, (self.width, self.height), (other.width, other.height)
+        )
+        return self._get_pictures(new), other._get_pictures(obsolete)
 
-        return new, obsolete
+    def _get_pictures(self, variants) -> list[Picture]:
+        PictureClass = self.field.spec.picture_class
+        return [
+            PictureClass(self.name, file_type, fraction, self.storage, width)
+            for fraction, file_type, width in variants
+        ]
 
     def save(self, name, content, save=True):
+        self._clear_caches()
         super().save(name, content, save)
+        if conf.app_settings.DIMENSION_CACHE:
+            # the upload is still at hand, spare other processes reading it again
+            state.set_dimensions(
+                self.storage.deconstruct(), self.name, self._get_image_dimensions()
+            )
         self.save_all()
 
     def save_all(self):
@@ -169,11 +384,20 @@ class PictureFieldFile(ImageFieldFile):
 
     def delete(self, save=True):
         self.delete_all()
+        if self and conf.app_settings.DIMENSION_CACHE:
+            state.delete_dimensions(self.storage.deconstruct(), self.name)
+        if self and conf.app_settings.STATE_CACHE:
+            state.delete_state(
+                self.storage.deconstruct(), self.name, self.field.file_types
+            )
+        self._clear_caches()
         super().delete(save=save)
 
     def delete_all(self):
         if self:
-            import_string(conf.app_settings.PROCESSOR)(
+            self._invalidate_url_cache()
+            self.__dict__.pop("_ready_file_types_cache", None)
+            self.field.spec.processor(
                 self.storage.deconstruct(),
                 self.name,
                 [],
@@ -182,36 +406,69 @@ class PictureFieldFile(ImageFieldFile):
 
     def update_all(self, other: PictureFieldFile | None = None):
         if self:
-            if not other:
-                new = self.get_picture_files_list()
-                old = []
-            else:
-                new, old = self ^ other
-            import_string(conf.app_settings.PROCESSOR)(
-                self.storage.deconstruct(),
-                self.name,
-                [i.deconstruct() for i in new],
-                [i.deconstruct() for i in old],
+            self._invalidate_url_cache()
+            self.__dict__.pop("_ready_file_types_cache", None)
+            storage, file_name, new, old = self.get_update_payload(other)
+            self.field.spec.processor(
+                storage, file_name, new, old, **self.get_processor_options(new)
             )
 
+    def _invalidate_url_cache(self):
+        if conf.app_settings.URL_CACHE_TIMEOUT:
+            url_cache.invalidate(self.storage, self.name)
+
+    def get_processor_options(self, new: list | None = None) -> dict:
+        """Return the field-specific keyword arguments for the processor."""
+        options = {}
+        if self.field.deferred_file_types:
+            options["deferred_file_types"] = self.field.deferred_file_types
+        if self.field.queue_name:
+            options["queue_name"] = self.field.queue_name
+        elif new and conf.app_settings.SIZE_QUEUES:  # NoQA SIM102
+            # every picture is resized from the source, which dominates the cost
+            if queue_name := utils.size_queue_name(self.width * self.height * len(new)):
+                options["queue_name"] = queue_name
+        return options
+
+    def get_update_payload(
+        self, other: PictureFieldFile | None = None
+    ) -> tuple[tuple[str, list, dict], str, list, list]:
+        """Return the processor arguments to create and remove all pictures."""
+        if not other:
+            new = self.get_picture_files_list()
+            old = []
+        else:
+            new, old = self._diff(other)
+        return (
+            self.storage.deconstruct(),
+            self.name,
+            [i.deconstruct() for i in new],
+            [i.deconstruct() for i in old],
+        )
+
     def _get_image_dimensions(self):
         if not hasattr(self, "_dimensions_cache"):
+            storage = (
+                self._committed
+                and conf.app_settings.DIMENSION_CACHE
+                and self.storage.deconstruct()
+            )
+            if storage and (dimensions := state.get_dimensions(storage, self.name)):
+                self._dimensions_cache = dimensions
+                return dimensions
             if close := self.closed:
                 self.open()
             file_pos = self.tell()
             try:
-                self.seek(0)
-                img = Image.open(self)
-                self._dimensions_cache = img.size
-                if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):
-                    # EXIF tag 0x0112 (Orientation); values 5-8 indicate the stored
-                    # image is rotated 90 or 270 degrees, so width and height swap.
-                    self._dimensions_cache = self._dimensions_cache[::-1]
+                # only read the header, remote storages would download the whole file
+                self._dimensions_cache = probe.dimensions(self)
             finally:
                 if close:
                     self.close()
                 else:
                     self.seek(file_pos)
+            if storage:
+                state.set_dimensions(storage, self.name, self._dimensions_cache)
         return self._dimensions_cache
 
     @property
@@ -233,15 +490,50 @@ class PictureFieldFile(ImageFieldFile):
         return self._get_image_dimensions()[1]
 
     @property
-    def aspect_ratios(self) -> dict[Fraction | None, dict[str, dict[int, Picture]]]:
+    def aspect_ratios(
+        self,
+    ) -> Mapping[Fraction | None, Mapping[str, Mapping[int, Picture]]]:
         self._require_file()
-        return self.get_picture_files(
+        # the spec is replaced on field or settings changes, e.g. during migrations
+        key = self.name, self.width, self.height, self.field.spec
+        # memoized per instance, since templates and diffs access it repeatedly
+        try:
+            cached_key, aspect_ratios = self._aspect_ratios_cache
+        except AttributeError:
+            pass
+        else:
+            if cached_key == key:
+                return aspect_ratios
+        aspect_ratios = self.get_picture_files(
             file_name=self.name,
-            img_width=self.width,
-            img_height=self.height,
+            img_width=key[1],
+            img_height=key[2],
             storage=self.storage,
             field=self.field,
         )
+        self._aspect_ratios_cache = key, aspect_ratios
+        return aspect_ratios
+
+    def _clear_caches(self):
+        for name in (
+            "_aspect_ratios_cache",
+            "_dimensions_cache",
+            "_ready_file_types_cache",
+            "_url_cache",
+        ):
+            self.__dict__.pop(name, None)
+
+    @property
+    def url(self):
+        # resolved in bulk by prefetch_pictures
+        try:
+            name, url = self._url_cache
+        except AttributeError:
+            pass
+        else:
+            if name == self.name:
+                return url
+        return super().url
 
     @staticmethod
     def get_picture_files(
@@ -251,23 +543,84 @@ class PictureFieldFile(ImageFieldFile):
         img_height: int,
         storage: Storage,
         field: PictureField,
-    ) -> dict[Fraction | None, dict[str, dict[int, Picture]]]:
-        PictureClass = import_string(conf.app_settings.PICTURE_CLASS)
-        return {
-            ratio: {
-                file_type: {
-                    width: PictureClass(file_name, file_type, ratio, storage, width)
-                    for width in utils.source_set(
-                        (img_width, img_height),
-                        ratio=ratio,
-                        max_width=field.container_width,
-                        cols=field.grid_columns,
+    ) -> Mapping[Fraction | None, Mapping[str, Mapping[int, Picture]]]:
+        spec = field.spec
+        PictureClass = spec.picture_class
+        fractions = dict(spec.aspect_ratios)
+
+        # pictures are only created once looked up, e.g. by a template tag
+        def get_file_types(ratio):
+            fraction = fractions[ratio]
+            widths = spec.source_set((img_width, img_height), fraction)
+            return utils.LazyMapping(
+                spec.file_types,
+                lambda file_type: utils.LazyMapping(
+                    widths,
+                    lambda width: PictureClass(
+                        file_name, file_type, fraction, storage, width
+                    ),
+                ),
+            )
+
+        return utils.LazyMapping(fractions, get_file_types)
+
+    def get_ready_file_types(self) -> set[str]:
+        """
+        Return all file types, whose pictures are known to exist.
+
+        While the file is pending or failed, only file types, whose pictures have
+        been processed, are returned. Once the file is ready, only deferred file
+        types are checked, all others are always considered ready.
+        Without a ``STATE_CACHE``, all file types are considered ready.
+        """
+        self._require_file()
+        if not conf.app_settings.STATE_CACHE:
+            return set(self.field.file_types)
+        try:
+            # resolved in bulk by prefetch_pictures
+            name, file_types = self._ready_file_types_cache
+        except AttributeError:
+            pass
+        else:
+            if name == self.name:
+                return file_types
+        storage = self.storage.deconstruct()
+        status = state.get_status(storage, self.name)
+        ready = None
+        if status != state.READY or self.field.deferred_file_types:
+            ready = state.get_ready_file_types(storage, self.name)
+        return self._get_ready_file_types(storage, status, ready)
+
+    def _get_ready_file_types(
+        self, storage: tuple[str, list, dict], status: str, ready: set[str] | None
+    ) -> set[str]:
+        if not conf.app_settings.STATE_CACHE:
+            return set(self.field.file_types)
+        ready = ready or set()
+        if status != state.READY:
+            return ready & set(self.field.file_types)
+        file_types = set(self.field.file_types) - set(self.field.deferred_file_types)
+        if not self.field.deferred_file_types:
+            return file_types
+        if missing := set(self.field.deferred_file_types) - ready:
+            # the cache may have been cleared, fall back to the storage,
+            # unless the pictures have recently been missing
+            known_missing = state.get_missing_file_types(storage, self.name)
+            if missing := missing - known_missing:
+                sources = next(iter(self.aspect_ratios.values()))
+                if found := {
+                    file_type
+                    for file_type in missing
+                    if not sources[file_type]
+                    or self.storage.exists(max(sources[file_type].items())[1].name)
+                }:
+                    state.add_ready_file_types(storage, self.name, found)
+                    ready |= found
+                if missing - found:
+                    state.set_missing_file_types(
+                        storage, self.name, known_missing | (missing - found)
                     )
-                }
-                for file_type in field.file_types
-            }
-            for ratio in field.aspect_ratios
-        }
+        return file_types | (ready & set(self.field.deferred_file_types))
 
     def get_picture_files_list(self) -> set[Picture]:
         return {
@@ -288,6 +641,8 @@ class PictureField(ImageField):
         aspect_ratios: list[str | Fraction | None] = None,
         container_width: int = None,
         file_types: list[str] = None,
+        deferred_file_types: list[str] = None,
+        queue_name: str = None,
         pixel_densities: list[int] = None,
         grid_columns: int = None,
         breakpoints: {str: int} = None,
@@ -297,6 +652,8 @@ class PictureField(ImageField):
         self.aspect_ratios = aspect_ratios or [None]
         self.container_width = container_width or settings.CONTAINER_WIDTH
         self.file_types = file_types or settings.FILE_TYPES
+        self.deferred_file_types = deferred_file_types or []
+        self.queue_name = queue_name
         self.pixel_densities = pixel_densities or settings.PIXEL_DENSITIES
         self.grid_columns = grid_columns or settings.GRID_COLUMNS
         self.breakpoints = breakpoints or settings.BREAKPOINTS
@@ -306,11 +663,34 @@ class PictureField(ImageField):
             **kwargs,
         )
 
+    #: Attributes, that are compiled into the field's spec.
+    spec_attributes = frozenset({
+        "aspect_ratios",
+        "container_width",
+        "file_types",
+        "grid_columns",
+        "breakpoints",
+    })
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.spec_attributes:
+            self.__dict__.pop("_spec", None)
+
+    @property
+    def spec(self) -> PictureFieldSpec:
+        """Return the compiled options of this field, shared by all hot paths."""
+        spec = self.__dict__.get("_spec")
+        if spec is None or spec.generation != conf.generation or spec.field is not self:
+            spec = self._spec = PictureFieldSpec.compile(self)
+        return spec
+
     def check(self, **kwargs):
         return (
             super().check(**kwargs)
             + self._check_aspect_ratios()
             + self._check_width_height_field()
+            + self._check_deferred_file_types()
         )
 
     def _check_aspect_ratios(self):
@@ -332,19 +712,66 @@ class PictureField(ImageField):
         return errors
 
     def _check_width_height_field(self):
-        if not (self.width_field and self.height_field):
+        if not (
+            self.width_field and self.height_field or conf.app_settings.DIMENSION_CACHE
+        ):
             return [
                 checks.Warning(
                     "width_field and height_field attributes are missing",
                     obj=self,
                     id="fields.E101",
-                    hint=f"Please add two positive integer fields to '{self.model._meta.app_label}.{self.model.__name__}' and add their field names as the 'width_field' and 'height_field' attribute for your picture field. Otherwise Django will not be able to cache the image aspect size causing disk IO and potential response time increases.",
+                    hint=f"Please add two positive integer fields to '{self.model._meta.app_label}.{self.model.__name__}' and add their field names as the 'width_field' and 'height_field' attribute for your picture field. Otherwise Django will not be able to cache the image aspect size causing disk IO and potential response time increases. Alternatively, set PICTURES[\"DIMENSION_CACHE\"] to a cache alias.",
                 )
             ]
         return []
 
+    def _check_deferred_file_types(self):
+        if set(self.deferred_file_types) - set(self.file_types):
+            return [
+                checks.Error(
+                    "Invalid deferred file types",
+                    obj=self,
+                    id="fields.E102",
+                    hint="Deferred file types must be a subset of the field's file types.",
+                )
+            ]
+        if self.deferred_file_types and not conf.app_settings.STATE_CACHE:
+            return [
+                checks.Error(
+                    "Deferred file types require a state cache",
+                    obj=self,
+                    id="fields.E103",
+                    hint='Set PICTURES["STATE_CACHE"] to a cache alias, that is shared between your web and worker processes.',
+                )
+            ]
+        return []
+
+    def update_dimension_fields(self, instance, force=False, *args, **kwargs):
+        if not force:
+            # called on post_init for every instance, e.g. each row of a queryset,
+            # check the raw values, before any field file or query is created
+            try:
+                value = instance.__dict__[self.attname]
+            except KeyError:
+                return  # deferred
+            names = [name for name in (self.width_field, self.height_field) if name]
+            if not value or any(name not in instance.__dict__ for name in names):
+                return  # no file or deferred dimensions, which would cost a query
+            if all(instance.__dict__[name] for name in names):
+                return
+            if not conf.app_settings.UPDATE_DIMENSIONS_ON_INIT and (
+                isinstance(value, str) or getattr(value, "_committed", False)
+            ):
+                # only read new files, width and height are read lazily otherwise
+                return
+        super().update_dimension_fields(instance, force, *args, **kwargs)
+
     def deconstruct(self):
         name, path, args, kwargs = super().deconstruct()
+        if self.deferred_file_types:
+            kwargs["deferred_file_types"] = self.deferred_file_types
+        if self.queue_name:
+            kwargs["queue_name"] = self.queue_name
         return (
             name,
             path,
@@ -359,3 +786,87 @@ class PictureField(ImageField):
                 "breakpoints": self.breakpoints,
             },
         )
+
+
+def prefetch_pictures(
+    objects, field_name: str, *ratios, container: int | None = None, **breakpoints
+) -> list:
+    """
+    Resolve the render data of a picture field for many objects at once.
+
+    The processing state, dimensions and picture URLs of all files are looked up
+    in bulk and stored on the field files, which the template tag and the DRF
+    field use. Pass aspect ratios to only resolve their URLs, all by default.
+    """
+    objects = list(objects)
+    field_files = [
+        field_file for obj in objects if (field_file := getattr(obj, field_name))
+    ]
+    if not field_files:
+        return objects
+    field = field_files[0].field
+    field.spec.get_sizes(container or field.container_width, **breakpoints)
+    storage = field.storage.deconstruct()
+    file_names = [field_file.name for field_file in field_files]
+    states = state.get_many(storage, file_names)
+    dimensions = state.get_many_dimensions(storage, file_names)
+    if conf.app_settings.URL_CACHE_TIMEOUT:
+        url_cache.prefetch(field.storage, file_names)
+    with url_cache.batch():
+        for field_file in field_files:
+            name = field_file.name
+            if name in dimensions:
+                field_file._dimensions_cache = dimensions[name]
+            ready = field_file._get_ready_file_types(storage, *states[name])
+            field_file._ready_file_types_cache = name, ready
+            field_file._url_cache = name, field_file.storage.url(name)
+            aspect_ratios = field_file.aspect_ratios
+            for ratio in ratios or aspect_ratios:
+                try:
+                    sources = aspect_ratios[ratio]
+                except KeyError as e:
+                    raise ValueError(
+                        f"Invalid ratio: {ratio}. Choices are: {', '.join(filter(None, aspect_ratios.keys()))}"
+                    ) from e
+                for file_type in ready & sources.keys():
+                    for picture in sources[file_type].values():
+                        picture.url  # cached on the picture or by the URL cache
+    return objects
+
+
+class PictureQuerySet(QuerySet):
+    """A queryset, that resolves the pictures of its objects in bulk."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._picture_lookups = []
+
+    def with_pictures(
+        self, field_name: str, *ratios, container: int | None = None, **breakpoints
+    ) -> PictureQuerySet:
+        """Resolve the pictures of a field, once the queryset is evaluated."""
+        clone = self._chain()
+        clone._picture_lookups.append((field_name, ratios, container, breakpoints))
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._picture_lookups = self._picture_lookups[:]
+        return clone
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super()._fetch_all()
+        if (
+            fetched
+            and self._picture_lookups
+            and issubclass(self._iterable_class, ModelIterable)
+        ):
+            for field_name, ratios, container, breakpoints in self._picture_lookups:
+                prefetch_pictures(
+                    self._result_cache,
+                    field_name,
+                    *ratios,
+                    container=container,
+                    **breakpoints,
+                )
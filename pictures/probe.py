@@ -0,0 +1,202 @@
+"""Read image dimensions from file headers, without reading the image data."""
+
+from __future__ import annotations
+
+import io
+import struct
+
+from PIL import Image
+
+__all__ = ["CHUNK_SIZE", "dimensions"]
+
+#: Number of bytes read first, each following read doubles the bytes read in total.
+CHUNK_SIZE = 4096
+
+#: EXIF orientations, that rotate the stored image by 90 or 270 degrees.
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+#: ISOBMFF brands of HEIF images, including AVIF.
+HEIF_BRANDS = {b"mif1", b"msf1", b"heic", b"heix", b"hevc", b"hevx", b"avif", b"avis"}
+
+
+class _Incomplete(Exception):
+    """The header exceeds the bytes read so far."""
+
+
+def dimensions(file) -> tuple[int, int]:
+    """
+    Return the width and height of an image, as displayed after EXIF orientation.
+
+    The file is read from its start in growing chunks, until the header can be
+    parsed. Only WebP files seek past their image data to read EXIF metadata.
+    """
+    file.seek(0)
+    buffer = b""
+    size = CHUNK_SIZE
+    while True:
+        chunk = file.read(size)
+        buffer += chunk
+        eof = len(chunk) < size
+        try:
+            width, height, transposed = _parse(file, buffer, eof=eof)
+        except _Incomplete:
+            if eof:
+                raise
+            size = len(buffer)
+            continue
+        return (height, width) if transposed else (width, height)
+
+
+def _parse(file, buffer: bytes, *, eof: bool) -> tuple[int, int, bool]:
+    try:
+        if buffer[:4] == b"RIFF" and buffer[8:12] == b"WEBP":
+            return _parse_webp(file, buffer)
+        if buffer[4:8] == b"ftyp" and HEIF_BRANDS & _heif_brands(buffer):
+            return _parse_heif(buffer)
+    except (_Incomplete, struct.error, IndexError) as e:
+        if not eof:
+            raise _Incomplete from e
+        # malformed header, let Pillow have a go at the whole file
+    try:
+        return _parse_pillow(buffer)
+    except (OSError, SyntaxError, EOFError, ValueError, struct.error) as e:
+        if eof:
+            raise
+        raise _Incomplete from e
+
+
+def _parse_pillow(buffer: bytes) -> tuple[int, int, bool]:
+    with Image.open(io.BytesIO(buffer)) as img:
+        if img.format == "PNG" and "exif" not in img.info:
+            # EXIF data precedes the image data, which would be loaded to look for it
+            return *img.size, False
+        orientation = img.getexif().get(0x0112, 1)
+        return *img.size, orientation in TRANSPOSED_ORIENTATIONS
+
+
+def _read(buffer: bytes, offset: int, size: int) -> bytes:
+    if offset + size > len(buffer):
+        raise _Incomplete
+    return buffer[offset : offset + size]
+
+
+def _read_at(file, buffer: bytes, offset: int, size: int) -> bytes:
+    if offset + size <= len(buffer):
+        return buffer[offset : offset + size]
+    file.seek(offset)
+    data = file.read(size)
+    file.seek(len(buffer))
+    if len(data) < size:
+        raise _Incomplete
+    return data
+
+
+def _parse_webp(file, buffer: bytes) -> tuple[int, int, bool]:
+    # https://developers.google.com/speed/webp/docs/riff_container
+    header = _read(buffer, 12, 18)
+    chunk = header[:4]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", header[14:18])
+        return width & 0x3FFF, height & 0x3FFF, False
+    if chunk == b"VP8L":
+        bits = int.from_bytes(header[9:13], "little")
+        return (bits & 0x3FFF) + 1, (bits >> 14 & 0x3FFF) + 1, False
+    if chunk != b"VP8X":
+        raise _Incomplete
+    width = int.from_bytes(header[12:15], "little") + 1
+    height = int.from_bytes(header[15:18], "little") + 1
+    if not header[8] & 0x08:  # no EXIF chunk
+        return width, height, False
+    # the EXIF chunk usually follows the image data, skip other chunks
+    offset = 12
+    while True:
+        chunk, size = struct.unpack("<4sI", _read_at(file, buffer, offset, 8))
+        if chunk == b"EXIF":
+            exif = Image.Exif()
+            exif.load(_read_at(file, buffer, offset + 8, size))
+            orientation = exif.get(0x0112, 1)
+            return width, height, orientation in TRANSPOSED_ORIENTATIONS
+        offset += 8 + size + size % 2
+
+
+def _boxes(buffer: bytes, offset: int, end: int):
+    while offset + 8 <= end:
+        size, box_type = struct.unpack(">I4s", _read(buffer, offset, 8))
+        header_size = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", _read(buffer, offset + 8, 8))
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            raise _Incomplete
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+
+def _heif_brands(buffer: bytes) -> set[bytes]:
+    # the major brand is followed by the minor version and compatible brands
+    size = int.from_bytes(buffer[:4], "big")
+    return {buffer[8:12]} | {
+        buffer[i : i + 4] for i in range(16, min(size, len(buffer)), 4)
+    }
+
+
+def _find_box(buffer: bytes, offset: int, end: int, box_type: bytes):
+    for child_type, child_offset, child_end in _boxes(buffer, offset, end):
+        if child_type == box_type:
+            _read(buffer, child_offset, child_end - child_offset)
+            return child_offset, child_end
+    raise _Incomplete
+
+
+def _parse_heif(buffer: bytes) -> tuple[int, int, bool]:
+    # ISO/IEC 23008-12, the primary item's ispe and irot properties define its size
+    for box_type, offset, end in _boxes(buffer, 0, 2**63):
+        if box_type == b"meta":
+            _read(buffer, offset, end - offset)
+            break
+    else:
+        raise _Incomplete
+    offset += 4  # version and flags of the full box
+    pitm_offset, _ = _find_box(buffer, offset, end, b"pitm")
+    version = buffer[pitm_offset]
+    item_id_format = ">H" if version == 0 else ">I"
+    (primary_item_id,) = struct.unpack_from(item_id_format, buffer, pitm_offset + 4)
+    iprp_offset, iprp_end = _find_box(buffer, offset, end, b"iprp")
+    ipco_offset, ipco_end = _find_box(buffer, iprp_offset, iprp_end, b"ipco")
+    properties = list(_boxes(buffer, ipco_offset, ipco_end))
+    ipma_offset, _ = _find_box(buffer, iprp_offset, iprp_end, b"ipma")
+    version, flags = buffer[ipma_offset], buffer[ipma_offset + 3]
+    (entry_count,) = struct.unpack_from(">I", buffer, ipma_offset + 4)
+    position = ipma_offset + 8
+    item_id_format = ">H" if version < 1 else ">I"
+    for _ in range(entry_count):
+        (item_id,) = struct.unpack_from(item_id_format, buffer, position)
+        position += struct.calcsize(item_id_format)
+        association_count = buffer[position]
+        position += 1
+        indexes = []
+        for _ in range(association_count):
+            if flags & 1:
+                (index,) = struct.unpack_from(">H", buffer, position)
+                indexes.append(index & 0x7FFF)
+                position += 2
+            else:
+                indexes.append(buffer[position] & 0x7F)
+                position += 1
+        if item_id == primary_item_id:
+            break
+    else:
+        raise _Incomplete
+    size = None
+    transposed = False
+    for index in filter(None, indexes):  # zero means no property
+        box_type, box_offset, _ = properties[index - 1]
+        if box_type == b"ispe":
+            size = struct.unpack_from(">II", buffer, box_offset + 4)
+        elif box_type == b"irot":
+            transposed = buffer[box_offset] & 0x03 in (1, 3)
+    if size is None:
+        raise _Incomplete
+    return *size, transposed
@@ -0,0 +1,82 @@
+"""Capture profiles of slow picture processing tasks."""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import datetime
+import hashlib
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from pictures import conf
+
+__all__ = ["profile"]
+
+logger = logging.getLogger(__name__)
+
+
+def _get_profile_dir() -> Path:
+    return Path(
+        conf.app_settings.PROFILE_DIR or Path(tempfile.gettempdir()) / "pictures"
+    )
+
+
+@contextlib.contextmanager
+def profile(file_name: str):
+    """
+    Profile a task and store the profile, if it exceeds the ``PROFILE_THRESHOLD``.
+
+    Yields a dictionary, that may be filled with metadata about the source file.
+    The profile is written to the ``PROFILE_DIR`` in ``pstats`` format,
+    next to a JSON file containing the metadata.
+    """
+    threshold = conf.app_settings.PROFILE_THRESHOLD
+    metadata = {}
+    if threshold is None:
+        yield metadata
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # only one profiler may be active at a time, e.g. across threads
+        logger.debug("Another profiler is active, skipping %r.", file_name)
+        yield metadata
+        return
+    started = time.perf_counter()
+    try:
+        yield metadata
+    finally:
+        profiler.disable()
+        duration = time.perf_counter() - started
+        if duration > threshold:
+            _dump(profiler, file_name, duration, metadata)
+
+
+def _dump(profiler: cProfile.Profile, file_name: str, duration: float, metadata):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    digest = hashlib.md5(file_name.encode(), usedforsecurity=False).hexdigest()[:8]
+    path = _get_profile_dir() / f"{now:%Y%m%dT%H%M%S%f}-{digest}"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path.with_suffix(".prof"))
+        path.with_suffix(".json").write_text(
+            json.dumps(
+                {
+                    "file_name": file_name,
+                    "duration": duration,
+                    "created": now.isoformat(),
+                    **metadata,
+                },
+                default=str,
+                indent=2,
+            )
+        )
+    except OSError:
+        logger.warning("Failed to store profile of %r.", file_name, exc_info=True)
+    else:
+        logger.info("Stored profile of %r at %s.", file_name, path)
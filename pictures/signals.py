@@ -0,0 +1,55 @@
+"""Signals sent while processing pictures."""
+
+from __future__ import annotations
+
+import contextlib
+import time
+
+from django.dispatch import Signal
+from django.utils.module_loading import import_string
+
+from pictures import conf
+
+__all__ = ["stage_processed", "picture_processed", "trace"]
+
+#: Sent after each processing stage with the ``stage`` name, its ``duration``
+#: in seconds, the ``exception`` raised (if any) and the stage's ``tags``.
+stage_processed = Signal()
+
+#: Sent once all tasks of a source file have been completed or if one failed,
+#: with the deconstructed ``storage``, the ``file_name`` and its ``status``.
+picture_processed = Signal()
+
+
+@contextlib.contextmanager
+def trace(sender, stage: str, **tags):
+    """
+    Time a processing stage and send the :data:`stage_processed` signal.
+
+    If a ``TRACER`` is configured, the stage is also wrapped in its span.
+    """
+    tracer = conf.app_settings.TRACER
+    span = (
+        import_string(tracer)(
+            f"pictures.{stage}",
+            attributes={key: value for key, value in tags.items() if value is not None},
+        )
+        if tracer
+        else contextlib.nullcontext()
+    )
+    exception = None
+    started = time.perf_counter()
+    try:
+        with span:
+            yield
+    except Exception as e:
+        exception = e
+        raise
+    finally:
+        stage_processed.send(
+            sender=sender,
+            stage=stage,
+            duration=time.perf_counter() - started,
+            exception=exception,
+            tags=tags,
+        )
@@ -0,0 +1,302 @@
+"""
+Keep track of the processing state of pictures, via Django's cache framework.
+
+The state is only tracked, if ``PICTURES["STATE_CACHE"]`` is set. Otherwise,
+all files are considered ready. Checkpoints are always kept in the ``CACHE``.
+"""
+
+from __future__ import annotations
+
+import collections
+import hashlib
+import json
+
+from django.core.cache import caches
+
+from pictures import conf
+
+__all__ = [
+    "PENDING",
+    "READY",
+    "FAILED",
+    "DEGRADED",
+    "get_status",
+    "get_many",
+    "set_pending",
+    "set_failed",
+    "complete_task",
+    "delete_state",
+    "get_ready_file_types",
+    "add_ready_file_types",
+    "get_missing_file_types",
+    "set_missing_file_types",
+    "get_checkpoint",
+    "set_checkpoint",
+    "delete_checkpoint",
+    "get_dimensions",
+    "get_many_dimensions",
+    "set_dimensions",
+    "delete_dimensions",
+]
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+DEGRADED = "degraded"
+
+
+def _cache_key(prefix: str, *parts) -> str:
+    # JSON normalizes tuples and lists, which differ between web and worker processes
+    payload = json.dumps(parts, default=str, sort_keys=True)
+    digest = hashlib.md5(payload.encode(), usedforsecurity=False).hexdigest()
+    return f"pictures:{prefix}:{digest}"
+
+
+def get_ready_file_types(
+    storage: tuple[str, list, dict], file_name: str
+) -> set[str] | None:
+    """Return the file types that have been processed or None if unknown."""
+    if alias := conf.app_settings.STATE_CACHE:
+        return caches[alias].get(_cache_key("state", storage, file_name))
+    return None
+
+
+def add_ready_file_types(
+    storage: tuple[str, list, dict], file_name: str, file_types: set[str]
+) -> None:
+    """Mark all pictures of the given file types as processed."""
+    if alias := conf.app_settings.STATE_CACHE:
+        cache = caches[alias]
+        key = _cache_key("state", storage, file_name)
+        cache.set(
+            key,
+            (cache.get(key) or set()) | set(file_types),
+            timeout=conf.app_settings.STATE_TIMEOUT,
+        )
+
+
+def get_missing_file_types(storage: tuple[str, list, dict], file_name: str) -> set[str]:
+    """Return the file types, whose pictures have recently been missing in the storage."""
+    if alias := conf.app_settings.STATE_CACHE:
+        return caches[alias].get(_cache_key("missing", storage, file_name), set())
+    return set()
+
+
+def set_missing_file_types(
+    storage: tuple[str, list, dict], file_name: str, file_types: set[str]
+) -> None:
+    """Remember, that the pictures of the given file types are missing for a while."""
+    if alias := conf.app_settings.STATE_CACHE:
+        caches[alias].set(
+            _cache_key("missing", storage, file_name),
+            set(file_types),
+            timeout=conf.app_settings.MISSING_TIMEOUT,
+        )
+
+
+def get_status(storage: tuple[str, list, dict], file_name: str) -> str:
+    """Return the processing status of a file, which is ready unless known otherwise."""
+    if alias := conf.app_settings.STATE_CACHE:
+        return caches[alias].get(_cache_key("status", storage, file_name), READY)
+    return READY
+
+
+def get_many(
+    storage: tuple[str, list, dict], file_names: list[str]
+) -> dict[str, tuple[str, set[str] | None]]:
+    """Return the status and ready file types of many files in a single lookup."""
+    if not (alias := conf.app_settings.STATE_CACHE):
+        return dict.fromkeys(file_names, (READY, None))
+    keys = {
+        file_name: (
+            _cache_key("status", storage, file_name),
+            _cache_key("state", storage, file_name),
+        )
+        for file_name in file_names
+    }
+    values = caches[alias].get_many([key for pair in keys.values() for key in pair])
+    return {
+        file_name: (values.get(status_key, READY), values.get(state_key))
+        for file_name, (status_key, state_key) in keys.items()
+    }
+
+
+def set_pending(
+    storage: tuple[str, list, dict], file_name: str, tasks: list[set[str]]
+) -> None:
+    """Mark a file as pending, given the file types processed by each of its tasks."""
+    if not (alias := conf.app_settings.STATE_CACHE):
+        return
+    cache = caches[alias]
+    cache.delete_many([
+        _cache_key("state", storage, file_name),
+        _cache_key("skipped", storage, file_name),
+    ])
+    cache.set_many(
+        {
+            _cache_key("status", storage, file_name): PENDING,
+            _cache_key("pending", storage, file_name): len(tasks),
+            **{
+                _cache_key("pending", storage, file_name, file_type): count
+                for file_type, count in collections.Counter(
+                    file_type for file_types in tasks for file_type in file_types
+                ).items()
+            },
+        },
+        timeout=conf.app_settings.PENDING_TIMEOUT,
+    )
+
+
+def set_failed(storage: tuple[str, list, dict], file_name: str) -> None:
+    """Mark a file as failed, until a task retry succeeds."""
+    if alias := conf.app_settings.STATE_CACHE:
+        caches[alias].set(
+            _cache_key("status", storage, file_name),
+            FAILED,
+            timeout=conf.app_settings.STATE_TIMEOUT,
+        )
+
+
+def complete_task(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    file_types: set[str],
+    skipped: set[str] = frozenset(),
+) -> str | None:
+    """
+    Mark a task of a file as completed and return its status, if it was the last one.
+
+    File types are marked ready, once all tasks processing them have been completed.
+    Files, that haven't been marked as pending, are ready after any task.
+    File types with skipped pictures are never ready and the file is degraded,
+    until they have been processed again.
+    """
+    if not (alias := conf.app_settings.STATE_CACHE):
+        return DEGRADED if skipped else READY
+    cache = caches[alias]
+    skipped_key = _cache_key("skipped", storage, file_name)
+    degraded = cache.get(skipped_key) or set()
+    ready = set()
+    for file_type in file_types:
+        key = _cache_key("pending", storage, file_name, file_type)
+        try:
+            if cache.decr(key) > 0:
+                continue
+        except ValueError:
+            # not pending, e.g. processed in bulk, which covers all pictures
+            degraded.discard(file_type)
+        else:
+            cache.delete(key)
+        ready.add(file_type)
+    degraded |= set(skipped)
+    if degraded:
+        cache.set(skipped_key, degraded, timeout=conf.app_settings.STATE_TIMEOUT)
+    else:
+        cache.delete(skipped_key)
+    add_ready_file_types(storage, file_name, ready - degraded)
+    key = _cache_key("pending", storage, file_name)
+    try:
+        if cache.decr(key) > 0:
+            return None
+    except ValueError:
+        pass
+    else:
+        cache.delete(key)
+    if degraded:
+        # only file types, that are known to be ready, are rendered
+        cache.set(
+            _cache_key("status", storage, file_name),
+            DEGRADED,
+            timeout=conf.app_settings.STATE_TIMEOUT,
+        )
+        return DEGRADED
+    cache.delete(_cache_key("status", storage, file_name))
+    return READY
+
+
+def delete_state(
+    storage: tuple[str, list, dict], file_name: str, file_types: list[str]
+) -> None:
+    """Remove the processing state of a deleted file."""
+    if alias := conf.app_settings.STATE_CACHE:
+        keys = [
+            _cache_key(prefix, storage, file_name)
+            for prefix in ("status", "state", "skipped", "missing", "pending")
+        ]
+        keys += [
+            _cache_key("pending", storage, file_name, file_type)
+            for file_type in file_types
+        ]
+        caches[alias].delete_many(keys)
+
+
+def get_checkpoint(
+    storage: tuple[str, list, dict], file_name: str, new: list[tuple[str, list, dict]]
+) -> set[int]:
+    """Return the indexes of new pictures completed by a previous task attempt."""
+    return caches[conf.app_settings.CACHE].get(
+        _cache_key("checkpoint", storage, file_name, new), set()
+    )
+
+
+def set_checkpoint(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]],
+    completed: set[int],
+) -> None:
+    caches[conf.app_settings.CACHE].set(
+        _cache_key("checkpoint", storage, file_name, new),
+        completed,
+        timeout=conf.app_settings.CHECKPOINT_TIMEOUT,
+    )
+
+
+def delete_checkpoint(
+    storage: tuple[str, list, dict], file_name: str, new: list[tuple[str, list, dict]]
+) -> None:
+    caches[conf.app_settings.CACHE].delete(
+        _cache_key("checkpoint", storage, file_name, new)
+    )
+
+
+def get_dimensions(
+    storage: tuple[str, list, dict], file_name: str
+) -> tuple[int, int] | None:
+    """Return the width and height of a source file, if they have been stored."""
+    if alias := conf.app_settings.DIMENSION_CACHE:
+        return caches[alias].get(_cache_key("dimensions", storage, file_name))
+    return None
+
+
+def get_many_dimensions(
+    storage: tuple[str, list, dict], file_names: list[str]
+) -> dict[str, tuple[int, int]]:
+    """Return the stored width and height of many source files by file name."""
+    if not (alias := conf.app_settings.DIMENSION_CACHE):
+        return {}
+    keys = {
+        _cache_key("dimensions", storage, file_name): file_name
+        for file_name in file_names
+    }
+    return {
+        keys[key]: dimensions
+        for key, dimensions in caches[alias].get_many(list(keys)).items()
+    }
+
+
+def set_dimensions(
+    storage: tuple[str, list, dict], file_name: str, dimensions: tuple[int, int]
+) -> None:
+    """Store the width and height of a source file, which never change for a name."""
+    if alias := conf.app_settings.DIMENSION_CACHE:
+        caches[alias].set(
+            _cache_key("dimensions", storage, file_name),
+            tuple(dimensions),
+            timeout=None,
+        )
+
+
+def delete_dimensions(storage: tuple[str, list, dict], file_name: str) -> None:
+    if alias := conf.app_settings.DIMENSION_CACHE:
+        caches[alias].delete(_cache_key("dimensions", storage, file_name))
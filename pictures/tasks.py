@@ -1,15 +1,39 @@
 from __future__ import annotations
 
-import warnings
+import asyncio
+import atexit
+import bisect
+import contextlib
+import functools
+import importlib
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Protocol
 
-import django
+from asgiref.sync import sync_to_async
+from django import db
 from django.db import transaction
-from PIL import Image
+from django.db.models import Q, QuerySet
+from django.utils.module_loading import import_string
+from PIL import Image, UnidentifiedImageError
 
-from pictures import conf, utils
+from pictures import conf, profiling, signals, state, utils
 from pictures.conf import app_settings
-from pictures.models import PillowPicture
+from pictures.models import Picture, PillowPicture
+
+logger = logging.getLogger(__name__)
+
+#: Encoder parameters to trade file size for speed, once a deadline is exceeded.
+FAST_SAVE_PARAMS = {
+    "AVIF": {"speed": 10},
+    "WEBP": {"method": 0},
+}
+
+#: Subclasses of OSError, that retrying won't resolve, e.g. a corrupt or missing source.
+PERMANENT_ERRORS = (UnidentifiedImageError, FileNotFoundError)
 
 
 def noop(*args, **kwargs) -> None:
@@ -23,197 +47,523 @@ class PictureProcessor(Protocol):
         file_name: str,
         new: list[tuple[str, list, dict]] | None = None,
         old: list[tuple[str, list, dict]] | None = None,
+        **options,
     ) -> None: ...
 
 
+class BatchPictureProcessor(Protocol):
+    def __call__(
+        self,
+        batch: list[
+            tuple[
+                tuple[str, list, dict],
+                str,
+                list[tuple[str, list, dict]],
+                list[tuple[str, list, dict]],
+            ]
+        ],
+        queue_name: str | None = None,
+    ) -> None: ...
+
+
+def _save_picture(picture: Picture, image: Image.Image, **params) -> None:
+    """Save a picture, retrying transient storage errors with an exponential backoff."""
+    settings = conf.app_settings
+    for attempt in range(settings.RETRIES + 1):
+        try:
+            picture.save(image, **params)
+        except PERMANENT_ERRORS:
+            raise
+        except OSError:
+            if attempt >= settings.RETRIES:
+                raise
+            logger.warning("Failed to save %r, retrying.", picture, exc_info=True)
+            time.sleep(settings.RETRY_BACKOFF * 2**attempt)
+        else:
+            return
+
+
 def _process_picture(
     storage: tuple[str, list, dict],
     file_name: str,
     new: list[tuple[str, list, dict]] | None = None,
     old: list[tuple[str, list, dict]] | None = None,
+    *,
+    memo: dict | None = None,
+    **options,
 ) -> None:
     new = new or []
     old = old or []
-    storage = utils.reconstruct(*storage)
-    if new:
-        with storage.open(file_name) as fs, Image.open(fs) as img:
-            img = PillowPicture.pre_process(img)
-            for picture in new:
-                picture = utils.reconstruct(*picture)
-                picture.save(img)
+    with (
+        signals.trace(PillowPicture, "process", file_name=file_name, pictures=len(new)),
+        profiling.profile(file_name) as metadata,
+    ):
+        settings = conf.app_settings
+        deadline = settings.TASK_DEADLINE and time.monotonic() + settings.TASK_DEADLINE
+        storage_obj = utils.reconstruct(*storage, memo=memo)
+        pictures = [utils.reconstruct(*picture, memo=memo) for picture in new]
+        # skip pictures, that have been saved by a previous attempt of the same task
+        completed = state.get_checkpoint(storage, file_name, new)
+        errors = []
+        skipped = []
+        degraded = []
+        degrade = False
+        if pending := sorted(
+            (i for i in range(len(pictures)) if i not in completed),
+            key=lambda i: pictures[i].width,
+        ):
+            with contextlib.ExitStack() as stack:
+                with signals.trace(PillowPicture, "open", file_name=file_name):
+                    fs = stack.enter_context(storage_obj.open(file_name))
+                    img = stack.enter_context(Image.open(fs))
+                metadata.update(
+                    width=img.width,
+                    height=img.height,
+                    format=img.format,
+                    mode=img.mode,
+                    icc_profile="icc_profile" in img.info,
+                    pictures=len(pending),
+                )
+                tags = {"file_name": file_name, "source_pixels": img.width * img.height}
+                with signals.trace(PillowPicture, "decode", **tags):
+                    img.load()
+                with signals.trace(PillowPicture, "pre_process", **tags):
+                    img = PillowPicture.pre_process(img)
+                # the orientation has been applied, share the displayed dimensions
+                state.set_dimensions(storage, file_name, img.size)
+                for index in pending:
+                    picture = pictures[index]
+                    if deadline and time.monotonic() > deadline:
+                        # drop the remaining, largest pictures
+                        skipped.append(picture)
+                        continue
+                    params = (
+                        FAST_SAVE_PARAMS.get(picture.file_type, {}) if degrade else {}
+                    )
+                    started = time.monotonic()
+                    try:
+                        _save_picture(picture, img, **params)
+                    except Exception as e:
+                        errors.append(e)
+                    else:
+                        completed.add(index)
+                        state.set_checkpoint(storage, file_name, new, completed)
+                        if params:
+                            degraded.append(picture)
+                    if settings.PICTURE_DEADLINE:
+                        # use faster encoder settings for all remaining pictures
+                        degrade |= (
+                            time.monotonic() - started > settings.PICTURE_DEADLINE
+                        )
+        if degraded or skipped:
+            logger.warning(
+                "Processing %r exceeded its deadline: %d pictures were saved with faster"
+                " encoder settings, %d pictures were skipped.",
+                file_name,
+                len(degraded),
+                len(skipped),
+                extra={
+                    "degraded": [picture.deconstruct() for picture in degraded],
+                    "skipped": [picture.deconstruct() for picture in skipped],
+                },
+            )
 
-    for picture in old:
-        picture = utils.reconstruct(*picture)
-        picture.delete()
+        for picture in old:
+            picture = utils.reconstruct(*picture, memo=memo)
+            picture.delete()
 
+        if errors:
+            state.set_failed(storage, file_name)
+            signals.picture_processed.send(
+                sender=PillowPicture,
+                storage=storage,
+                file_name=file_name,
+                status=state.FAILED,
+            )
+            # let the task queue retry the task, which resumes from the checkpoint
+            raise errors[0]
+        if new:
+            state.delete_checkpoint(storage, file_name, new)
+            if status := state.complete_task(
+                storage,
+                file_name,
+                {picture.file_type for picture in pictures},
+                skipped={picture.file_type for picture in skipped},
+            ):
+                signals.picture_processed.send(
+                    sender=PillowPicture,
+                    storage=storage,
+                    file_name=file_name,
+                    status=status,
+                )
 
-process_picture: PictureProcessor = _process_picture
 
+def _set_pending(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    tasks: list[list[tuple[str, list, dict]]],
+) -> None:
+    """Mark a file as pending, until all of its tasks have been completed."""
+    memo = {}
+    state.set_pending(
+        storage,
+        file_name,
+        [
+            {utils.reconstruct(*picture, memo=memo).file_type for picture in task_new}
+            for task_new in tasks
+        ],
+    )
 
-try:
-    from dramatiq import actor
-except ImportError:
-    pass
-else:
 
-    @actor(queue_name=conf.app_settings.QUEUE_NAME)
-    def process_picture_with_dramatiq(
-        storage: tuple[str, list, dict],
-        file_name: str,
-        new: list[tuple[str, list, dict]] | None = None,
-        old: list[tuple[str, list, dict]] | None = None,
-    ) -> None:
-        _process_picture(storage, file_name, new, old)
-
-    def dramatiq_process_picture(  # noqa: F811
-        storage: tuple[str, list, dict],
-        file_name: str,
-        new: list[tuple[str, list, dict]] | None = None,
-        old: list[tuple[str, list, dict]] | None = None,
-    ) -> None:
-        if django.VERSION >= (6, 0):
-            warnings.warn(
-                "The picture processor 'dramatiq_process_picture' is deprecated in favor of Django's tasks framework."
-                " Deletion is scheduled with the expiration of Django 5.2 LTS version support.",
-                PendingDeprecationWarning,
-                stacklevel=2,
+def _process_pictures(batch, **options) -> None:
+    """
+    Process multiple source files, sharing storage instances and their clients.
+
+    A failing file is marked as failed and doesn't fail the batch,
+    since retrying the task would process all other files again.
+    """
+    memo = {}
+    for storage, file_name, new, old in batch:
+        try:
+            _process_picture(storage, file_name, new, old, memo=memo)
+        except Exception:
+            logger.exception("Failed to process %r.", file_name)
+            state.set_failed(storage, file_name)
+
+
+def process_many(objects, field_name: str | None = None, *, batch_size=None) -> int:
+    """
+    Create all pictures for many files, while sending only one task per batch.
+
+    Objects may either be a queryset, model instances or picture field files.
+    A field name is required, unless you pass picture field files.
+    Files are batched per queue, e.g. of the field or its size class.
+    Returns the number of processed files.
+    """
+    batch_size = batch_size or conf.app_settings.BATCH_SIZE
+    if isinstance(objects, QuerySet):
+        objects = objects.exclude(
+            Q(**{field_name: ""}) | Q(**{field_name: None})
+        ).iterator(chunk_size=batch_size)
+    field_files = (getattr(obj, field_name) if field_name else obj for obj in objects)
+    processor = _get_batch_processor()
+
+    def send(queue_name, batch):
+        if queue_name:
+            processor(batch, queue_name=queue_name)
+        else:
+            # custom batch processors may not support queues
+            processor(batch)
+
+    count = 0
+    batches = {}
+    for field_file in field_files:
+        if not field_file:
+            continue
+        payload = field_file.get_update_payload()
+        queue_name = field_file.get_processor_options(payload[2]).get("queue_name")
+        batch = batches.setdefault(queue_name, [])
+        batch.append(payload)
+        if len(batch) >= batch_size:
+            send(queue_name, batches.pop(queue_name))
+        count += 1
+    for queue_name, batch in batches.items():
+        send(queue_name, batch)
+    return count
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_slots: threading.BoundedSemaphore | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    global _executor, _executor_slots
+    with _executor_lock:
+        if _executor is None:
+            settings = conf.app_settings
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THREAD_POOL_SIZE,
+                thread_name_prefix="pictures",
             )
-        transaction.on_commit(
-            lambda: process_picture_with_dramatiq.send(
-                storage=storage,
-                file_name=file_name,
-                new=new,
-                old=old,
+            _executor_slots = threading.BoundedSemaphore(
+                settings.THREAD_POOL_SIZE + settings.THREAD_QUEUE_SIZE
             )
-        )
+            atexit.register(shutdown)
+        return _executor, _executor_slots
 
-    process_picture = dramatiq_process_picture  # type: ignore[assignment]
 
+def _process_picture_in_thread(*args, **kwargs) -> None:
+    try:
+        _process_picture(*args, **kwargs)
+    finally:
+        # the cache or storage backend may have opened a connection in this thread
+        db.connections.close_all()
 
-try:
-    from celery import shared_task
-except ImportError:
-    pass
-else:
 
-    @shared_task(
-        ignore_results=True,
-        retry_backoff=True,
-    )
-    def process_picture_with_celery(
-        storage: tuple[str, list, dict],
-        file_name: str,
-        new: list[tuple[str, list, dict]] | None = None,
-        old: list[tuple[str, list, dict]] | None = None,
-    ) -> None:
-        _process_picture(storage, file_name, new, old)
+def _submit(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+) -> Future | None:
+    """Submit a task to the thread pool or return None if the queue is full."""
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        logger.warning("Thread pool queue is full, processing %r elsewhere.", file_name)
+        return None
 
-    def celery_process_picture(  # noqa: F811
-        storage: tuple[str, list, dict],
-        file_name: str,
-        new: list[tuple[str, list, dict]] | None = None,
-        old: list[tuple[str, list, dict]] | None = None,
-    ) -> None:
-        if django.VERSION >= (6, 0):
-            warnings.warn(
-                "The picture processor 'celery_process_picture' is deprecated in favor of Django's tasks framework."
-                " Deletion is scheduled with the expiration of Django 5.2 LTS version support.",
-                PendingDeprecationWarning,
-                stacklevel=2,
-            )
-        transaction.on_commit(
-            lambda: process_picture_with_celery.apply_async(
-                kwargs=dict(
-                    storage=storage,
-                    file_name=file_name,
-                    new=new,
-                    old=old,
-                ),
-                queue=conf.app_settings.QUEUE_NAME,
-            )
-        )
+    def done(future: Future) -> None:
+        slots.release()
+        if exc := future.exception():
+            logger.error("Failed to process %r.", file_name, exc_info=exc)
 
-    process_picture = celery_process_picture  # type: ignore[assignment]
+    future = executor.submit(_process_picture_in_thread, storage, file_name, new, old)
+    future.add_done_callback(done)
+    return future
 
 
-try:
-    from django_rq import job
-except ImportError:
-    pass
-else:
+def threaded_process_picture(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+    **options,
+) -> None:
+    """
+    Process pictures on a process-wide thread pool, once the transaction is committed.
+
+    Pillow releases the GIL while resizing and encoding images.
+    Use this processor if you don't want to operate a task queue.
+    Should the thread pool queue be full, pictures are processed in the current thread.
+    """
+
+    def submit():
+        if new:
+            _set_pending(storage, file_name, [new])
+        if _submit(storage, file_name, new, old) is None:
+            _process_picture(storage, file_name, new, old)
 
-    @job(conf.app_settings.QUEUE_NAME)
-    def process_picture_with_django_rq(
-        storage: tuple[str, list, dict],
-        file_name: str,
-        new: list[tuple[str, list, dict]] | None = None,
-        old: list[tuple[str, list, dict]] | None = None,
-    ) -> None:
-        _process_picture(storage, file_name, new, old)
+    transaction.on_commit(submit)
 
-    def rq_process_picture(  # noqa: F811
-        storage: tuple[str, list, dict],
-        file_name: str,
-        new: list[tuple[str, list, dict]] | None = None,
-        old: list[tuple[str, list, dict]] | None = None,
-    ) -> None:
-        if django.VERSION >= (6, 0):
-            warnings.warn(
-                "The picture processor 'rq_process_picture' is deprecated in favor of Django's tasks framework."
-                " Deletion is scheduled with the expiration of Django 5.2 LTS version support.",
-                PendingDeprecationWarning,
-                stacklevel=2,
+
+async def aprocess_picture(
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+    **options,
+) -> None:
+    """
+    Process pictures on the thread pool, without blocking the event loop.
+
+    Should the thread pool queue be full, asyncio's default executor is used.
+    Use it with the ``noop`` processor, since saving a field file runs the
+    ``PROCESSOR`` already.
+    """
+    if new:
+        # the state cache is synchronous
+        await sync_to_async(_set_pending)(storage, file_name, [new])
+    if future := _submit(storage, file_name, new, old):
+        await asyncio.wrap_future(future)
+    else:
+        await asyncio.to_thread(
+            _process_picture_in_thread, storage, file_name, new, old
+        )
+
+
+def shutdown(wait: bool = True) -> None:
+    """Shut down the thread pool, waiting for all submitted tasks by default."""
+    global _executor, _executor_slots
+    with _executor_lock:
+        executor, _executor, _executor_slots = _executor, None, None
+    if executor is not None:
+        atexit.unregister(shutdown)
+        executor.shutdown(wait=wait)
+
+
+def _fan_out(
+    new: list[tuple[str, list, dict]],
+    old: list[tuple[str, list, dict]],
+    deferred_file_types: list[str] = (),
+    queue_name: str | None = None,
+) -> list[tuple[str, list[tuple[str, list, dict]], list[tuple[str, list, dict]]]]:
+    """
+    Split pictures into tasks and return their queue name, new and old pictures.
+
+    Pictures are ordered from the smallest to the largest width. Depending on
+    the ``FAN_OUT`` setting, they are split by aspect ratio and file type
+    or by the ``FAN_OUT_WIDTHS`` buckets. Tasks that only contain pictures of
+    the smallest bucket are sent to the ``PRIORITY_QUEUE_NAME``.
+    Deferred file types are always sent last, in a single task,
+    to the ``DEFERRED_QUEUE_NAME``. All other tasks are sent to the given
+    queue, which defaults to the ``QUEUE_NAME``.
+    """
+    settings = conf.app_settings
+    queue_name = queue_name or settings.QUEUE_NAME
+    memo = {}
+    groups = {}
+    deferred = []
+    for picture, deconstructed in sorted(
+        ((utils.reconstruct(*i, memo=memo), i) for i in new),
+        key=lambda item: item[0].width,
+    ):
+        if picture.file_type in deferred_file_types:
+            deferred.append(deconstructed)
+            continue
+        if settings.FAN_OUT == "file_type":
+            key = picture.aspect_ratio, picture.file_type
+        elif settings.FAN_OUT == "width":
+            key = bisect.bisect_left(settings.FAN_OUT_WIDTHS, picture.width)
+        else:
+            key = None
+        groups.setdefault(key, []).append((picture.width, deconstructed))
+
+    payloads = [
+        (
+            settings.PRIORITY_QUEUE_NAME
+            if settings.FAN_OUT
+            and settings.PRIORITY_QUEUE_NAME
+            and settings.FAN_OUT_WIDTHS
+            and group[-1][0] <= settings.FAN_OUT_WIDTHS[0]
+            else queue_name,
+            [deconstructed for _, deconstructed in group],
+            [],
+        )
+        for group in groups.values()
+    ]
+    if deferred:
+        payloads.append((
+            settings.DEFERRED_QUEUE_NAME or queue_name,
+            deferred,
+            [],
+        ))
+    payloads = payloads or [(queue_name, [], [])]
+    # obsolete pictures are removed by the last task
+    payloads[-1][2].extend(old)
+    return payloads
+
+
+def _dispatch(
+    enqueue: Callable[..., None],
+    storage: tuple[str, list, dict],
+    file_name: str,
+    new: list[tuple[str, list, dict]] | None = None,
+    old: list[tuple[str, list, dict]] | None = None,
+    **options,
+) -> None:
+    """Enqueue one or more tasks via ``enqueue(queue_name, **kwargs)`` on commit."""
+    payloads = _fan_out(new or [], old or [], **options)
+    if new:
+        transaction.on_commit(
+            functools.partial(
+                _set_pending,
+                storage,
+                file_name,
+                [task_new for _, task_new, _ in payloads],
             )
+        )
+    for queue_name, task_new, task_old in payloads:
         transaction.on_commit(
-            lambda: process_picture_with_django_rq.delay(
+            functools.partial(
+                enqueue,
+                queue_name,
                 storage=storage,
                 file_name=file_name,
-                new=new,
-                old=old,
+                new=task_new,
+                old=task_old,
             )
         )
 
-    process_picture = rq_process_picture  # type: ignore[assignment]
-
-
-try:
-    from django.tasks import exceptions, task
-except ImportError:
-    pass
-else:
-    try:
-
-        @task(
-            backend=conf.app_settings.BACKEND,
-            queue_name=conf.app_settings.QUEUE_NAME,
-        )
-        def process_picture_with_django_tasks(
-            storage: tuple[str, list, dict],
-            file_name: str,
-            new: list[tuple[str, list, dict]] | None = None,
-            old: list[tuple[str, list, dict]] | None = None,
-        ) -> None:
-            _process_picture(storage, file_name, new, old)
-
-        def process_picture(  # noqa: F811
-            storage: tuple[str, list, dict],
-            file_name: str,
-            new: list[tuple[str, list, dict]] | None = None,
-            old: list[tuple[str, list, dict]] | None = None,
-        ) -> None:
-            transaction.on_commit(
-                lambda: process_picture_with_django_tasks.enqueue(
-                    storage=storage,
-                    file_name=file_name,
-                    new=new,
-                    old=old,
-                )
-            )
 
-    except exceptions.InvalidTask as e:
-        if app_settings.PROCESSOR == "pictures.tasks.process_picture":
-            raise exceptions.ImproperlyConfigured(
-                "Pictures are processed on a separate queue by default,"
-                " please update the 'TASKS' setting in accordance with Django-Pictures documentation."
-                " If you need to continue to use a deprecated processor, please set the 'PROCESSOR' to another processor."
-            ) from e
+#: Task queue integrations, in order of precedence for the default processor.
+INTEGRATIONS = {
+    "pictures.contrib.django_tasks": [
+        "process_picture_with_django_tasks",
+        "process_pictures_with_django_tasks",
+    ],
+    "pictures.contrib.django_rq": [
+        "process_picture_with_django_rq",
+        "rq_process_picture",
+        "process_pictures_with_django_rq",
+        "rq_process_pictures",
+    ],
+    "pictures.contrib.celery": [
+        "process_picture_with_celery",
+        "celery_process_picture",
+        "process_pictures_with_celery",
+        "celery_process_pictures",
+    ],
+    "pictures.contrib.dramatiq": [
+        "process_picture_with_dramatiq",
+        "dramatiq_process_picture",
+        "process_pictures_with_dramatiq",
+        "dramatiq_process_pictures",
+    ],
+}
+
+
+def _get_default_integration():
+    """Return the first integration that can be imported or None."""
+    for module_name in INTEGRATIONS:
+        try:
+            return importlib.import_module(module_name)
+        except ImportError:
+            continue
+    return None
+
+
+def _get_integration(path: str):
+    """Return the integration named by a processor's dotted path or None."""
+    module_name, _, name = path.rpartition(".")
+    if module_name in INTEGRATIONS:
+        return importlib.import_module(module_name)
+    if module_name == __name__:
+        for integration, names in INTEGRATIONS.items():
+            if name in names:
+                return importlib.import_module(integration)
+    return None
+
+
+def _get_batch_processor() -> BatchPictureProcessor:
+    """
+    Return the batch processor, which defaults to the processor's integration.
+
+    The default processor and batch processor both use the default integration.
+    """
+    path = conf.app_settings.BATCH_PROCESSOR
+    if path == f"{__name__}.process_pictures" and (
+        integration := _get_integration(conf.app_settings.PROCESSOR)
+    ):
+        return integration.process_pictures
+    return import_string(path)
+
+
+def __getattr__(name: str):
+    # Integrations are imported on first use, since each of them
+    # imports its task queue and registers its tasks.
+    if name in ("process_picture", "process_pictures"):
+        integration = _get_default_integration()
+        value = getattr(integration, name) if integration else globals()[f"_{name}"]
+    else:
+        for module_name, names in INTEGRATIONS.items():
+            if name in names:
+                value = getattr(importlib.import_module(module_name), name)
+                break
+        else:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def _load_configured_integrations() -> None:
+    """Import the integrations used by the processor settings, to register their tasks with workers."""
+    # only import the modules, a worker may be importing one of them right now
+    for path in (app_settings.PROCESSOR, app_settings.BATCH_PROCESSOR):
+        if path in (f"{__name__}.process_picture", f"{__name__}.process_pictures"):
+            _get_default_integration()
+        else:
+            _get_integration(path)
+
+
+_load_configured_integrations()
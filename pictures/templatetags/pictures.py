@@ -3,13 +3,15 @@ import warnings
 from django import template
 from django.template import loader
 
-from .. import utils
+from .. import metrics, url_cache
 from ..conf import app_settings
 
 register = template.Library()
 
 
 @register.simple_tag()
+@metrics.template_renders.measure(tag="picture")
+@url_cache.batch()
 def picture(field_file, img_alt=None, ratio=None, container=None, **kwargs):
     field = field_file.field
     container = container or field.container_width
@@ -28,6 +30,13 @@ def picture(field_file, img_alt=None, ratio=None, container=None, **kwargs):
         raise ValueError(
             f"Invalid ratio: {ratio}. Choices are: {', '.join(filter(None, field_file.aspect_ratios.keys()))}"
         ) from e
+    # only advertise file types, once their pictures have been processed
+    ready_file_types = field_file.get_ready_file_types()
+    sources = {
+        file_type: srcset
+        for file_type, srcset in sources.items()
+        if file_type in ready_file_types
+    }
     for key, value in kwargs.items():
         if key in field.breakpoints:
             breakpoints[key] = value
@@ -42,7 +51,7 @@ def picture(field_file, img_alt=None, ratio=None, container=None, **kwargs):
         "alt": img_alt,
         "ratio": (ratio or "3/2").replace("/", "x"),
         "sources": sources,
-        "media": utils.sizes(field=field, container_width=container, **breakpoints),
+        "media": field.spec.get_sizes(container, **breakpoints),
         "picture_attrs": picture_attrs,
         "img_attrs": img_attrs,
         "use_placeholders": app_settings.USE_PLACEHOLDERS,
@@ -50,6 +59,7 @@ def picture(field_file, img_alt=None, ratio=None, container=None, **kwargs):
 
 
 @register.simple_tag()
+@metrics.template_renders.measure(tag="img_url")
 def img_url(field_file, file_type, width, ratio=None) -> str:
     """
     Return the URL for a specific image file.
@@ -69,6 +79,9 @@ def img_url(field_file, file_type, width, ratio=None) -> str:
             f"Invalid file type: {file_type}. Choices are: {', '.join(file_types.keys())}"
         ) from e
     url = field_file.url
+    if file_type.upper() not in field_file.get_ready_file_types():
+        # the pictures are still being processed, use the source file
+        return url
     if not sizes.items():
         warnings.warn(
             "Image is smaller than requested size, using source file URL.",
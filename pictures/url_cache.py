@@ -0,0 +1,146 @@
+"""Cache picture URLs, which are costly to resolve for storages that sign them."""
+
+from __future__ import annotations
+
+import contextlib
+import datetime
+import threading
+import time
+
+from django.core.cache import caches
+
+from pictures import conf
+from pictures.state import _cache_key
+
+__all__ = [
+    "batch",
+    "get_url",
+    "get_timeout",
+    "is_signed",
+    "invalidate",
+    "prefetch",
+]
+
+#: Maximum number of source files, whose picture URLs are cached per process.
+MAX_SIZE = 1024
+
+_urls: dict = {}
+_lock = threading.Lock()
+_batch = threading.local()
+
+
+def _get_expiry(storage) -> float | None:
+    """Return the number of seconds signed URLs are valid or None if unsigned."""
+    if not getattr(storage, "querystring_auth", True):
+        return None
+    # S3, Google Cloud and Azure storages respectively
+    for attr in ("querystring_expire", "expiration", "expiration_secs"):
+        if expire := getattr(storage, attr, None):
+            if isinstance(expire, datetime.timedelta):
+                expire = expire.total_seconds()
+            return expire
+    return None
+
+
+def is_signed(storage) -> bool:
+    """Return whether the storage signs its URLs, which expire."""
+    return _get_expiry(storage) is not None
+
+
+def get_timeout(storage) -> float:
+    """
+    Return the cache timeout for URLs of the given storage.
+
+    Signed URLs are cached for half of their expiry at most,
+    so that every URL remains valid for a while after being served.
+    """
+    timeout = conf.app_settings.URL_CACHE_TIMEOUT
+    if (expire := _get_expiry(storage)) is not None:
+        return min(timeout, expire / 2)
+    return timeout
+
+
+def get_url(storage, parent_name: str, name: str) -> str:
+    """Return the URL of a picture and only resolve it via the storage once."""
+    now = time.time()
+    generation, expires, urls = _urls.get((storage, parent_name), (None, 0, None))
+    if generation != conf.generation or expires <= now:
+        expires, urls = _get_shared(storage, parent_name) or (
+            now + get_timeout(storage),
+            {},
+        )
+        _set_local(storage, parent_name, expires, urls)
+    try:
+        return urls[name]
+    except KeyError:
+        urls[name] = url = storage.url(name)
+        if (pending := getattr(_batch, "pending", None)) is not None:
+            pending[storage, parent_name] = expires, urls
+        else:
+            _set_shared(storage, parent_name, expires, urls)
+        return url
+
+
+@contextlib.contextmanager
+def batch():
+    """
+    Write the URLs resolved within the block to the shared cache at once.
+
+    Every source file's URLs are written once, instead of once per resolved URL.
+    Can be used as a decorator, nested blocks are written by the outermost one.
+    """
+    if getattr(_batch, "pending", None) is not None:
+        yield
+        return
+    _batch.pending = {}
+    try:
+        yield
+    finally:
+        pending, _batch.pending = _batch.pending, None
+        for (storage, parent_name), (expires, urls) in pending.items():
+            _set_shared(storage, parent_name, expires, urls)
+
+
+def prefetch(storage, parent_names: list[str]) -> None:
+    """Load the picture URLs of many source files from the shared cache at once."""
+    if not (alias := conf.app_settings.URL_CACHE):
+        return
+    now = time.time()
+    deconstructed = storage.deconstruct()
+    keys = {}
+    for parent_name in parent_names:
+        generation, expires, _ = _urls.get((storage, parent_name), (None, 0, None))
+        if generation != conf.generation or expires <= now:
+            keys[_cache_key("urls", deconstructed, parent_name)] = parent_name
+    for key, (expires, urls) in caches[alias].get_many(list(keys)).items():
+        _set_local(storage, keys[key], expires, urls)
+
+
+def invalidate(storage, parent_name: str) -> None:
+    """Remove all cached picture URLs of a source file."""
+    _urls.pop((storage, parent_name), None)
+    if alias := conf.app_settings.URL_CACHE:
+        caches[alias].delete(_cache_key("urls", storage.deconstruct(), parent_name))
+
+
+def _set_local(storage, parent_name: str, expires: float, urls: dict) -> None:
+    with _lock:
+        _urls.pop((storage, parent_name), None)
+        while len(_urls) >= MAX_SIZE:
+            del _urls[next(iter(_urls))]
+        _urls[storage, parent_name] = conf.generation, expires, urls
+
+
+def _get_shared(storage, parent_name: str) -> tuple[float, dict] | None:
+    if alias := conf.app_settings.URL_CACHE:
+        return caches[alias].get(_cache_key("urls", storage.deconstruct(), parent_name))
+    return None
+
+
+def _set_shared(storage, parent_name: str, expires: float, urls: dict) -> None:
+    if alias := conf.app_settings.URL_CACHE:
+        caches[alias].set(
+            _cache_key("urls", storage.deconstruct(), parent_name),
+            (expires, urls),
+            timeout=expires - time.time(),
+        )
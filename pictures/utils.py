@@ -1,18 +1,21 @@
 from __future__ import annotations
 
+import itertools
 import math
 import random
 import sys
 import warnings
+from collections.abc import Callable, Iterable, Mapping
 from fractions import Fraction
 from functools import lru_cache
 from urllib.parse import unquote
 
+from django.core.files.storage import storages
 from PIL import Image, ImageDraw, ImageFont
 
 from . import conf
 
-__all__ = ["sizes", "source_set", "placeholder"]
+__all__ = ["sizes", "source_set", "size_queue_name", "url_template", "placeholder"]
 
 
 def _grid(*, field, _columns=12, **breakpoint_sizes):
@@ -64,16 +67,113 @@ def source_set(
     size: tuple[int, int], *, ratio: str | Fraction | None, max_width: int, cols: int
 ) -> set:
     ratio = Fraction(ratio) if ratio else None
+    return set(
+        _source_set(
+            tuple(size),
+            (ratio.numerator, ratio.denominator) if ratio else None,
+            max_width,
+            cols,
+            tuple(conf.app_settings.PIXEL_DENSITIES),
+        )
+    )
+
+
+@lru_cache(maxsize=1024)
+def _source_set(
+    size: tuple[int, int],
+    ratio: tuple[int, int] | None,
+    max_width: int,
+    cols: int,
+    pixel_densities: tuple[int, ...],
+) -> tuple[int, ...]:
+    """
+    Return all widths of a source set, cached by geometry and configuration.
+
+    Each width ``max_width * column / cols * density`` is compared as the integer
+    numerator ``max_width * column * density``, to avoid fraction arithmetic.
+    The widths are returned in the iteration order of the set.
+    """
     img_width, img_height = size
-    ratio = ratio or Fraction(img_width, img_height)
-    # calc all widths at 1X resolution
-    widths = (max_width * (w + 1) / cols for w in range(cols))
-    # exclude widths above the max width
-    widths = (w for w in widths if w <= max_width)
-    # sizes for all screen resolutions
-    widths = (w * res for w in widths for res in conf.app_settings.PIXEL_DENSITIES)
+    ratio_width, ratio_height = ratio or size
+    # calc all widths at all screen resolutions, none exceed the max width at 1X
+    numerators = (
+        max_width * column * res
+        for column in range(1, cols + 1)
+        for res in pixel_densities
+    )
     # exclude sizes above the original image width or height
-    return {math.floor(w) for w in widths if w <= img_width and w / ratio <= img_height}
+    return tuple({
+        int(n // cols)
+        for n in numerators
+        if n <= img_width * cols and n * ratio_height <= img_height * ratio_width * cols
+    })
+
+
+#: Return the hit rate statistics of the source set cache.
+source_set.cache_info = _source_set.cache_info
+
+
+class LazyMapping(Mapping):
+    """A read-only mapping with known keys, whose values are created on first access."""
+
+    __slots__ = ("_keys", "_factory", "_values")
+
+    def __init__(self, keys: Iterable, factory: Callable):
+        self._keys = dict.fromkeys(keys)
+        self._factory = factory
+        self._values = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            if key not in self._keys:
+                raise
+        value = self._values[key] = self._factory(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def size_queue_name(cost: int) -> str | None:
+    """
+    Return the queue of the largest size class that applies to the given cost.
+
+    The cost is measured in source pixels times the number of pictures.
+    Returns None, if the cost is below all size classes.
+    """
+    queue_name, threshold = None, -1
+    for name, min_cost in conf.app_settings.SIZE_QUEUES.items():
+        if threshold < min_cost <= cost:
+            queue_name, threshold = name, min_cost
+    return queue_name
+
+
+def url_template(storage) -> str | None:
+    """
+    Return the URL template for pictures of the given storage, if any.
+
+    The template is either a string for all storages or a dictionary
+    of templates by storage alias, see Django's STORAGES setting.
+    """
+    template = conf.app_settings.URL_TEMPLATE
+    if not isinstance(template, dict):
+        return template
+    for alias, alias_template in template.items():
+        # storages may be lazy objects, which only proxy equality
+        if storage == storages[alias]:
+            return alias_template
+    return None
 
 
 @lru_cache
@@ -115,8 +215,19 @@ def placeholder(width: int, height: int, alt):
     return img
 
 
-def reconstruct(path: str, args: list, kwargs: dict):
-    """Reconstruct a class instance from its deconstructed state."""
+def reconstruct(path: str, args: list, kwargs: dict, *, memo: dict | None = None):
+    """
+    Reconstruct a class instance from its deconstructed state.
+
+    Pass a ``memo`` dictionary to share identical instances, like storages,
+    between multiple reconstructions.
+    """
+    if memo is not None:
+        key = repr((path, args, kwargs))
+        try:
+            return memo[key]
+        except KeyError:
+            pass
     module_name, _, name = path.rpartition(".")
     module = __import__(module_name, fromlist=[name])
     klass = getattr(module, name)
@@ -124,12 +235,22 @@ def reconstruct(path: str, args: list, kwargs: dict):
     _kwargs = {}
     for arg in args:
         try:
-            _args.append(reconstruct(*arg))
+            _args.append(reconstruct(*arg, memo=memo))
         except (TypeError, ValueError, ImportError):
             _args.append(arg)
-    for key, value in kwargs.items():
+    for key_, value in kwargs.items():
         try:
-            _kwargs[key] = reconstruct(*value)
+            _kwargs[key_] = reconstruct(*value, memo=memo)
         except (TypeError, ValueError, ImportError):
-            _kwargs[key] = value
-    return klass(*_args, **_kwargs)
+            _kwargs[key_] = value
+    obj = klass(*_args, **_kwargs)
+    if memo is not None:
+        memo[key] = obj
+    return obj
+
+
+def batched(iterable, n: int):
+    """Yield lists of ``n`` items from an iterable, the last one may be shorter."""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, n)):
+        yield batch
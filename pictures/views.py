@@ -3,9 +3,10 @@ from fractions import Fraction
 
 from django.http import Http404, HttpResponse
 
-from . import conf, utils
+from . import conf, metrics, utils
 
 
+@metrics.placeholder_renders.measure()
 def placeholder(request, width, ratio, file_type, alt):
     try:
         ratio = Fraction(ratio.replace("x", "/"))
@@ -21,3 +22,11 @@ def placeholder(request, width, ratio, file_type, alt):
     )
     img.save(response, file_type.upper())
     return response
+
+
+def export_metrics(request):
+    """Return all metrics of the current process in Prometheus' text format."""
+    return HttpResponse(
+        metrics.REGISTRY.expose(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
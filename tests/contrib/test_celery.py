@@ -0,0 +1,13 @@
+import pytest
+from PIL import UnidentifiedImageError
+
+pytest.importorskip("celery")
+
+from pictures.contrib import celery as celery_integration  # noqa: E402
+
+
+def test_process_picture_with_celery__autoretry():
+    task = celery_integration.process_picture_with_celery
+    assert issubclass(FileNotFoundError, task.autoretry_for)
+    assert issubclass(UnidentifiedImageError, task.dont_autoretry_for)
+    assert issubclass(FileNotFoundError, task.dont_autoretry_for)
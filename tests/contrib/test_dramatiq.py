@@ -0,0 +1,60 @@
+from unittest.mock import Mock
+
+import pytest
+
+pytest.importorskip("dramatiq")
+
+from pictures.contrib import dramatiq as dramatiq_integration  # noqa: E402
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = Mock()
+    monkeypatch.setattr(
+        dramatiq_integration.process_picture_with_dramatiq, "broker", broker
+    )
+    return broker
+
+
+def test_declare_queues(settings, broker):
+    settings.PICTURES = settings.PICTURES | {
+        "PRIORITY_QUEUE_NAME": "pictures-priority",
+        "DEFERRED_QUEUE_NAME": "pictures-deferred",
+        "SIZE_QUEUES": {"pictures-large": 500_000_000},
+    }
+    dramatiq_integration._declare_queues()
+    assert [call.args for call in broker.declare_queue.call_args_list] == [
+        ("pictures-priority",),
+        ("pictures-deferred",),
+        ("pictures-large",),
+    ]
+
+
+def test_declare_queues__default(broker):
+    dramatiq_integration._declare_queues()
+    broker.declare_queue.assert_not_called()
+
+
+def test_enqueue_with_dramatiq(broker):
+    dramatiq_integration._enqueue_with_dramatiq(
+        "pictures-large", storage=("storage", [], {}), file_name="image.jpg"
+    )
+    broker.declare_queue.assert_called_once_with("pictures-large")
+    (message,) = broker.enqueue.call_args.args
+    assert message.queue_name == "pictures-large"
+    assert message.kwargs == {
+        "storage": ("storage", [], {}),
+        "file_name": "image.jpg",
+    }
+
+
+def test_dramatiq_process_pictures(monkeypatch, instant_commit):
+    broker = Mock()
+    monkeypatch.setattr(
+        dramatiq_integration.process_pictures_with_dramatiq, "broker", broker
+    )
+    dramatiq_integration.dramatiq_process_pictures([], queue_name="pictures-large")
+    broker.declare_queue.assert_called_once_with("pictures-large")
+    (message,) = broker.enqueue.call_args.args
+    assert message.queue_name == "pictures-large"
+    assert message.kwargs == {"batch": []}
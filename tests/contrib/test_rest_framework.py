@@ -1,8 +1,10 @@
 from fractions import Fraction
 
 import pytest
+from django.core.cache import cache
 from django.core.files.storage import default_storage
 
+from pictures import state
 from pictures.models import Picture
 from tests.testapp import models
 
@@ -135,6 +137,24 @@ class TestPictureField:
             },
         }
 
+    @pytest.mark.django_db
+    def test_to_representation__pending(self, image_upload_file, settings):
+        settings.PICTURES["USE_PLACEHOLDERS"] = False
+        settings.PICTURES = settings.PICTURES | {"STATE_CACHE": "default"}
+        cache.clear()
+        profile = models.Profile.objects.create(picture=image_upload_file)
+        state.set_pending(
+            profile.picture.storage.deconstruct(), profile.picture.name, [{"AVIF"}]
+        )
+        serializer = ProfileSerializer(profile)
+
+        assert serializer.data["image"]["url"] == "/media/testapp/profile/image.png"
+        assert all(
+            not ratio["sources"]
+            for ratio in serializer.data["image"]["ratios"].values()
+        )
+        cache.clear()
+
     @pytest.mark.django_db
     def test_to_representation__with_aspect_ratios(
         self, rf, image_upload_file, settings
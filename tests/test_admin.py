@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+from pictures import admin
+from tests.testapp.models import SimpleModel
+
+
+@pytest.mark.django_db
+def test_process_pictures(rf, monkeypatch, image_upload_file):
+    SimpleModel.objects.create(picture=image_upload_file)
+    processor = Mock()
+    monkeypatch.setattr("pictures.tasks.process_pictures", processor)
+    modeladmin = Mock()
+    admin.process_pictures(modeladmin, rf.get("/"), SimpleModel.objects.all())
+    assert processor.call_count == 1
+    assert modeladmin.message_user.call_args.args[1] == (
+        "1 picture file is being processed."
+    )
+
+
+def test_import():
+    """Admin autodiscovery must not import the task queue."""
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, django; django.setup(); import pictures.admin;"
+            " assert 'pictures.tasks' not in sys.modules",
+        ],
+        check=True,
+        env=os.environ | {"DJANGO_SETTINGS_MODULE": "tests.testapp.settings"},
+    )
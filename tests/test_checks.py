@@ -1,3 +1,6 @@
+import os
+import subprocess
+import sys
 from unittest.mock import Mock
 
 from django.urls import NoReverseMatch
@@ -17,3 +20,114 @@ def test_placeholder_url_check(settings, monkeypatch):
 
     settings.PICTURES = settings.PICTURES | {"USE_PLACEHOLDERS": False}
     assert not checks.placeholder_url_check({})
+
+
+def test_url_template_check(settings):
+    settings.PICTURES = settings.PICTURES | {"URL_TEMPLATE": None}
+    assert not checks.url_template_check({})
+
+    settings.PICTURES = settings.PICTURES | {"URL_TEMPLATE": "/media/{name}"}
+    assert not checks.url_template_check({})
+
+    settings.PICTURES = settings.PICTURES | {
+        "URL_TEMPLATE": {"default": "/media/{name}"}
+    }
+    assert not checks.url_template_check({})
+
+    settings.PICTURES = settings.PICTURES | {"URL_TEMPLATE": "/static/{name}"}
+    errors = checks.url_template_check({})
+    assert errors
+    assert errors[0].id == "pictures.E002"
+
+    settings.PICTURES = settings.PICTURES | {"URL_TEMPLATE": {"not-a-storage": "/"}}
+    errors = checks.url_template_check({})
+    assert errors
+    assert errors[0].id == "pictures.E002"
+
+
+def enqueue_picture(*args, **kwargs):
+    """Pretend to send pictures to a broker."""
+
+
+def test_state_cache_check(settings):
+    settings.PICTURES = settings.PICTURES | {"STATE_CACHE": None}
+    assert not checks.state_cache_check({})
+
+    settings.PICTURES = settings.PICTURES | {
+        "STATE_CACHE": "default",
+        "PROCESSOR": "pictures.tasks.threaded_process_picture",
+    }
+    assert not checks.state_cache_check({})
+
+    settings.PICTURES = settings.PICTURES | {
+        "PROCESSOR": "tests.test_checks.enqueue_picture"
+    }
+    errors = checks.state_cache_check({})
+    assert errors
+    assert errors[0].id == "pictures.E003"
+
+    settings.CACHES = settings.CACHES | {
+        "shared": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}
+    }
+    settings.PICTURES = settings.PICTURES | {"STATE_CACHE": "shared"}
+    assert not checks.state_cache_check({})
+
+    settings.PICTURES = settings.PICTURES | {"STATE_CACHE": "not-a-cache"}
+    errors = checks.state_cache_check({})
+    assert errors
+    assert errors[0].id == "pictures.E003"
+
+
+def test_task_deadline_check(settings):
+    settings.PICTURES = settings.PICTURES | {"TASK_DEADLINE": None}
+    assert not checks.task_deadline_check({})
+
+    settings.PICTURES = settings.PICTURES | {"TASK_DEADLINE": 60}
+    errors = checks.task_deadline_check({})
+    assert errors
+    assert errors[0].id == "pictures.E004"
+
+    settings.PICTURES = settings.PICTURES | {"STATE_CACHE": "default"}
+    assert not checks.task_deadline_check({})
+
+
+def test_queue_check(settings, monkeypatch):
+    from pictures import tasks
+
+    assert not checks.queue_check({})
+    integration = Mock(__name__="pictures.contrib.django_rq")
+    monkeypatch.setattr(tasks, "_get_default_integration", lambda: integration)
+    settings.RQ_QUEUES = {"pictures": {}, "pictures-priority": {}}
+    settings.PICTURES = settings.PICTURES | {
+        "PRIORITY_QUEUE_NAME": "pictures-priority",
+        "SIZE_QUEUES": {"pictures-large": 500_000_000},
+    }
+    (error,) = checks.queue_check({})
+    assert error.id == "pictures.E005"
+    assert "'pictures-large'" in error.hint
+    assert "RQ_QUEUES" in error.hint
+
+    integration.__name__ = "pictures.contrib.django_tasks"
+    settings.TASKS = {"default": {"QUEUES": ["pictures", "pictures-large"]}}
+    (error,) = checks.queue_check({})
+    assert "'pictures-priority'" in error.hint
+    settings.TASKS = {"default": {"QUEUES": []}}
+    assert not checks.queue_check({})
+
+    integration.__name__ = "pictures.contrib.celery"
+    assert not checks.queue_check({})
+
+
+def test_checks__import():
+    """Checks must not import the task queue, unless it is needed."""
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, django; django.setup();"
+            " from django.core import checks; checks.run_checks();"
+            " assert 'pictures.tasks' not in sys.modules",
+        ],
+        check=True,
+        env=os.environ | {"DJANGO_SETTINGS_MODULE": "tests.testapp.settings"},
+    )
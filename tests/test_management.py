@@ -0,0 +1,87 @@
+from unittest.mock import Mock
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from tests.testapp.models import SimpleModel
+
+
+class TestPicturesProcess:
+    @pytest.mark.django_db
+    def test_handle(self, capsys, monkeypatch, image_upload_file):
+        SimpleModel.objects.create(picture=image_upload_file)
+        processor = Mock()
+        monkeypatch.setattr("pictures.tasks.process_pictures", processor)
+        call_command("pictures_process", "testapp.SimpleModel.picture")
+        assert processor.call_count == 1
+        assert "Processing 1 files." in capsys.readouterr().out
+
+    def test_handle__invalid_field(self):
+        with pytest.raises(CommandError) as e:
+            call_command("pictures_process", "testapp.SimpleModel")
+        assert str(e.value) == "Invalid field: testapp.SimpleModel"
+        with pytest.raises(CommandError) as e:
+            call_command("pictures_process", "testapp.SimpleModel.picture_width")
+        assert str(e.value) == "Not a picture field: testapp.SimpleModel.picture_width"
+
+
+class TestPicturesBackfillDimensions:
+    @pytest.mark.django_db
+    def test_handle(self, capsys, image_upload_file):
+        objs = [SimpleModel.objects.create(picture=image_upload_file) for _ in range(3)]
+        SimpleModel.objects.create()
+        SimpleModel.objects.update(picture_width=None, picture_height=None)
+        call_command(
+            "pictures_backfill_dimensions",
+            "testapp.SimpleModel.picture",
+            "--batch-size=2",
+        )
+        assert (
+            list(
+                SimpleModel.objects.filter(pk__in=[obj.pk for obj in objs]).values_list(
+                    "picture_width", "picture_height"
+                )
+            )
+            == [(800, 800)] * 3
+        )
+        out = capsys.readouterr().out
+        assert "Updated 2 rows, " in out
+        assert f"resume with --start-after={objs[1].pk}" in out
+        assert "Updated 3 rows in " in out
+
+    @pytest.mark.django_db
+    def test_handle__start_after(self, image_upload_file):
+        first = SimpleModel.objects.create(picture=image_upload_file)
+        SimpleModel.objects.create(picture=image_upload_file)
+        SimpleModel.objects.update(picture_width=None, picture_height=None)
+        call_command(
+            "pictures_backfill_dimensions",
+            "testapp.SimpleModel.picture",
+            f"--start-after={first.pk}",
+        )
+        # loading instances would update their dimensions
+        assert list(
+            SimpleModel.objects.order_by("pk").values_list("picture_width", flat=True)
+        ) == [None, 800]
+
+    @pytest.mark.django_db
+    def test_handle__missing_file(self, capsys, image_upload_file):
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        SimpleModel.objects.update(picture_width=None, picture_height=None)
+        obj.picture.storage.delete(obj.picture.name)
+        call_command("pictures_backfill_dimensions", "testapp.SimpleModel.picture")
+        assert SimpleModel.objects.values_list("picture_width", flat=True).get() is None
+        assert "Failed to read 1 files." in capsys.readouterr().err
+
+    def test_handle__no_dimension_fields(self):
+        with pytest.raises(CommandError) as e:
+            call_command("pictures_backfill_dimensions", "testapp.Profile.picture")
+        assert "has no width_field and height_field" in str(e.value)
+
+
+class TestPicturesMetrics:
+    def test_handle(self, capsys):
+        call_command("pictures_metrics")
+        assert (
+            "# TYPE pictures_tasks_processed_total counter\n" in capsys.readouterr().out
+        )
@@ -0,0 +1,120 @@
+import pytest
+
+from pictures import metrics, signals
+from tests.testapp.models import SimpleModel
+
+
+@pytest.fixture
+def registry():
+    metrics.REGISTRY.reset()
+    yield metrics.REGISTRY
+    metrics.REGISTRY.reset()
+
+
+class TestCounter:
+    def test_inc(self):
+        counter = metrics.Counter("test_total", "Test.", ["stage"])
+        counter.inc(stage="write")
+        counter.inc(2, stage="write")
+        assert counter.get(stage="write") == 3
+        assert counter.get(stage="encode") == 0
+
+    def test_inc__labels(self):
+        counter = metrics.Counter("test_total", "Test.", ["stage"])
+        with pytest.raises(ValueError) as e:
+            counter.inc(file_type="AVIF")
+        assert str(e.value) == "Metric 'test_total' requires the labels: stage"
+
+    def test_collect(self):
+        counter = metrics.Counter("test_total", "Test.", ["alt"])
+        counter.inc(alt='a "quoted"\nvalue')
+        assert list(counter.collect()) == [
+            "# HELP test_total Test.",
+            "# TYPE test_total counter",
+            r'test_total{alt="a \"quoted\"\nvalue"} 1.0',
+        ]
+
+
+class TestHistogram:
+    def test_observe(self):
+        histogram = metrics.Histogram("test_seconds", "Test.", buckets=[0.1, 1])
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        assert histogram.get_count() == 3
+        assert list(histogram.collect()) == [
+            "# HELP test_seconds Test.",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{le="0.1"} 1.0',
+            'test_seconds_bucket{le="1.0"} 2.0',
+            'test_seconds_bucket{le="+Inf"} 3.0',
+            "test_seconds_sum 5.55",
+            "test_seconds_count 3.0",
+        ]
+
+    def test_measure(self):
+        histogram = metrics.Histogram("test_seconds", "Test.", ["tag"])
+
+        @histogram.measure(tag="picture")
+        def render():
+            return "<picture>"
+
+        assert render() == "<picture>"
+        with histogram.measure(tag="img_url"):
+            pass
+        assert histogram.get_count(tag="picture") == 1
+        assert histogram.get_count(tag="img_url") == 1
+
+
+class TestRegistry:
+    def test_register(self):
+        registry = metrics.Registry()
+        registry.counter("test_total", "Test.")
+        with pytest.raises(ValueError) as e:
+            registry.counter("test_total", "Test.")
+        assert str(e.value) == "Metric 'test_total' is already registered."
+
+    def test_expose(self):
+        registry = metrics.Registry()
+        registry.counter("test_total", "Test.").inc()
+        assert registry.expose() == (
+            "# HELP test_total Test.\n# TYPE test_total counter\ntest_total 1.0\n"
+        )
+
+
+def test_record_stage(registry):
+    with signals.trace(None, "write", file_type="AVIF", bytes_written=100):
+        pass
+    with pytest.raises(OSError), signals.trace(None, "encode", file_type="AVIF"):
+        raise OSError
+    assert metrics.variants_created.get(file_type="AVIF") == 1
+    assert metrics.bytes_written.get(file_type="AVIF") == 100
+    assert metrics.stage_duration.get_count(stage="write") == 1
+    assert metrics.stage_duration.get_count(stage="encode") == 0
+    assert metrics.failures.get(stage="encode") == 1
+
+
+@pytest.mark.django_db
+def test_record_stage__process(registry, image_upload_file):
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    obj.picture.delete_all()
+    assert metrics.tasks_processed.get() == 2
+    assert metrics.variants_created.get(file_type="AVIF") == len(
+        obj.picture.get_picture_files_list()
+    )
+    assert metrics.variants_deleted.get(file_type="AVIF") == len(
+        obj.picture.get_picture_files_list()
+    )
+
+
+def test_callback():
+    callback = metrics.Callback("test_size", "Test.", lambda: 3)
+    assert list(callback.collect()) == [
+        "# HELP test_size Test.",
+        "# TYPE test_size gauge",
+        "test_size 3.0",
+    ]
+
+
+def test_source_set_cache(registry):
+    assert "pictures_source_set_cache_hits_total " in registry.expose()
@@ -1,3 +1,4 @@
+import os
 from unittest.mock import Mock
 
 import pytest
@@ -7,7 +8,7 @@ from django.db.models.fields.files import ImageFieldFile
 
 from pictures import migrations
 from pictures.models import PictureField
-from tests.testapp.models import Profile
+from tests.testapp.models import Profile, SimpleModel
 
 try:
     import dramatiq
@@ -428,3 +429,45 @@ class TestAlterPictureField:
         migration = migrations.AlterPictureField("profile", "picture", PictureField())
         from_field = Profile._meta.get_field("picture")
         benchmark(migration.update_pictures, from_field, ToModel)
+
+    @pytest.mark.django_db
+    @pytest.mark.benchmark(group="AlterPictureField.forward")
+    def test_forward__performance__rows(self, request, settings, benchmark):
+        """
+        Benchmark the diffs of update_pictures across synthetic rows.
+
+        Set PICTURES_BENCHMARK_ROWS=100000 to benchmark at scale.
+        """
+        rows = int(os.environ.get("PICTURES_BENCHMARK_ROWS", 1_000))
+        settings.PICTURES = settings.PICTURES | {"PROCESSOR": "pictures.tasks.noop"}
+
+        class ToModel(models.Model):
+            picture_width = models.PositiveIntegerField(null=True)
+            picture_height = models.PositiveIntegerField(null=True)
+            picture = PictureField(
+                upload_to="testapp/simplemodel/",
+                aspect_ratios=[None, "3/2", "21/9"],
+                file_types=["AVIF", "WEBP"],
+                width_field="picture_width",
+                height_field="picture_height",
+            )
+
+            class Meta:
+                app_label = request.node.name
+                db_table = "testapp_simplemodel"
+
+        SimpleModel.objects.bulk_create(
+            SimpleModel(
+                picture=f"testapp/simplemodel/{index}.jpg",
+                picture_width=(800, 1200, 4000)[index % 3],
+                picture_height=600,
+            )
+            for index in range(rows)
+        )
+        migration = migrations.AlterPictureField(
+            "simplemodel", "picture", PictureField()
+        )
+        from_field = SimpleModel._meta.get_field("picture")
+        benchmark.pedantic(
+            migration.update_pictures, args=(from_field, ToModel), rounds=1
+        )
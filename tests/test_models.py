@@ -1,17 +1,30 @@
 import contextlib
 import copy
+import dataclasses
 import io
+import types
 from fractions import Fraction
 from pathlib import Path
 from unittest.mock import Mock
 
 import pytest
-from django.core.files.storage import default_storage
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import ImageField
 from django.db.models.fields.files import ImageFieldFile
+from django.db.models.signals import post_init
+from django.template import Context, Template
 from PIL import Image, ImageCms, ImageDraw
 
-from pictures.models import PictureField, PillowPicture
+from pictures import probe, state, tasks, utils
+from pictures.models import (
+    PictureField,
+    PictureQuerySet,
+    PillowPicture,
+    prefetch_pictures,
+)
 from tests.testapp.models import JPEGModel, Profile, SimpleModel
 
 
@@ -62,6 +75,89 @@ class TestPillowPicture:
         assert hash(self.picture_with_ratio) != hash(self.picture_without_ratio)
         assert hash(self.picture_with_ratio) == hash(self.picture_with_ratio)
 
+    def test_hash__without_url(self, monkeypatch):
+        monkeypatch.setattr(
+            PillowPicture, "url", property(Mock(side_effect=AssertionError))
+        )
+        assert hash(self.picture_with_ratio) == hash(
+            PillowPicture(
+                parent_name="testapp/simplemodel/image.png",
+                file_type="AVIF",
+                aspect_ratio="4/3",
+                storage=default_storage,
+                width=800,
+            )
+        )
+
+    def test_immutable(self):
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            self.picture_with_ratio.width = 100
+        with pytest.raises((AttributeError, TypeError)):
+            self.picture_with_ratio.foo = "bar"
+        assert not hasattr(self.picture_with_ratio, "__dict__")
+
+    def test_url__cached(self, settings, monkeypatch):
+        settings.PICTURES = settings.PICTURES | {"USE_PLACEHOLDERS": False}
+        picture = PillowPicture(
+            parent_name="testapp/simplemodel/image.png",
+            file_type="AVIF",
+            aspect_ratio="4/3",
+            storage=default_storage,
+            width=800,
+        )
+        url = Mock(return_value="/media/image.avif")
+        monkeypatch.setattr(default_storage, "url", url)
+        assert picture.url == "/media/image.avif"
+        assert picture.url == "/media/image.avif"
+        assert url.call_count == 1
+        settings.PICTURES = settings.PICTURES | {"USE_PLACEHOLDERS": True}
+        assert picture.url == "/_pictures/image/4x3/800w.AVIF"
+
+    def test_url__signed(self, settings, monkeypatch):
+        settings.PICTURES = settings.PICTURES | {"USE_PLACEHOLDERS": False}
+        storage = FileSystemStorage()
+        storage.querystring_expire = 3600
+        url = Mock(return_value="/media/image.avif?signature=123")
+        monkeypatch.setattr(storage, "url", url)
+        picture = PillowPicture(
+            parent_name="testapp/simplemodel/image.png",
+            file_type="AVIF",
+            aspect_ratio="4/3",
+            storage=storage,
+            width=800,
+        )
+        assert picture.url == "/media/image.avif?signature=123"
+        assert picture.url == "/media/image.avif?signature=123"
+        assert url.call_count == 2
+
+    def test_name__override(self):
+        class CDNPicture(PillowPicture):
+            @property
+            def name(self):
+                return f"cdn/{self.width}w.{self.file_type.lower()}"
+
+        picture = CDNPicture(
+            parent_name="testapp/simplemodel/image.png",
+            file_type="AVIF",
+            aspect_ratio="4/3",
+            storage=default_storage,
+            width=800,
+        )
+        assert picture.name == "cdn/800w.avif"
+
+    def test_deconstruct(self):
+        assert self.picture_with_ratio.deconstruct() == (
+            "pictures.models.PillowPicture",
+            (
+                "testapp/simplemodel/image.png",
+                "AVIF",
+                "4/3",
+                default_storage.deconstruct(),
+                800,
+            ),
+            {},
+        )
+
     def test_eq(self):
         assert self.picture_with_ratio != self.picture_without_ratio
         assert self.picture_with_ratio == self.picture_with_ratio
@@ -74,6 +170,36 @@ class TestPillowPicture:
             == "/media/testapp/simplemodel/image/4_3/800w.avif"
         )
 
+    def test_url__template(self, settings, monkeypatch):
+        settings.PICTURES = settings.PICTURES | {
+            "USE_PLACEHOLDERS": False,
+            "URL_TEMPLATE": "https://cdn.example.com/{name}",
+        }
+        url = Mock(side_effect=AssertionError)
+        monkeypatch.setattr(default_storage, "url", url)
+        assert (
+            self.picture_with_ratio.url
+            == "https://cdn.example.com/testapp/simplemodel/image/4_3/800w.avif"
+        )
+        assert not url.called
+
+    def test_url__template__storage(self, settings):
+        settings.PICTURES = settings.PICTURES | {
+            "USE_PLACEHOLDERS": False,
+            "URL_TEMPLATE": {"staticfiles": "https://cdn.example.com/{name}"},
+        }
+        assert (
+            self.picture_with_ratio.url
+            == "/media/testapp/simplemodel/image/4_3/800w.avif"
+        )
+        settings.PICTURES = settings.PICTURES | {
+            "URL_TEMPLATE": {"default": "https://cdn.example.com/{name}"},
+        }
+        assert (
+            self.picture_with_ratio.url
+            == "https://cdn.example.com/testapp/simplemodel/image/4_3/800w.avif"
+        )
+
     def test_url__placeholder(self, settings):
         settings.PICTURES["USE_PLACEHOLDERS"] = True
         assert self.picture_with_ratio.url == "/_pictures/image/4x3/800w.AVIF"
@@ -774,6 +900,93 @@ class TestPictureFieldFile:
             assert obj.picture.aspect_ratios["1/1"]["AVIF"][100].path.exists()
             assert not path.exists()
 
+    @pytest.mark.django_db
+    def test_aspect_ratios__memoized(self, image_upload_file):
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        aspect_ratios = obj.picture.aspect_ratios
+        assert obj.picture.aspect_ratios is aspect_ratios
+        assert obj.picture.get_picture_files_list() == {
+            picture
+            for sources in aspect_ratios.values()
+            for srcset in sources.values()
+            for picture in srcset.values()
+        }
+
+        with override_field_aspect_ratios(obj.picture.field, ["1/1"]):
+            assert list(obj.picture.aspect_ratios) == ["1/1"]
+        assert obj.picture.aspect_ratios == aspect_ratios
+
+        obj.picture.name = "testapp/simplemodel/other.png"
+        assert obj.picture.aspect_ratios is not aspect_ratios
+        assert (
+            obj.picture.aspect_ratios[None]["AVIF"][100].parent_name
+            == "testapp/simplemodel/other.png"
+        )
+
+    @pytest.mark.django_db
+    def test_aspect_ratios__lazy(self, monkeypatch, image_upload_file):
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        init = Mock()
+        post_init = PillowPicture.__post_init__
+
+        def __post_init__(self):
+            init()
+            post_init(self)
+
+        monkeypatch.setattr(PillowPicture, "__post_init__", __post_init__)
+        aspect_ratios = obj.picture.aspect_ratios
+        assert list(aspect_ratios) == [None, "3/2", "16/9"]
+        assert not init.called
+        picture = aspect_ratios["16/9"]["AVIF"][100]
+        assert init.call_count == 1
+        assert aspect_ratios["16/9"]["AVIF"][100] is picture
+        assert init.call_count == 1
+        with pytest.raises(KeyError):
+            aspect_ratios["1/1"]
+        with pytest.raises(KeyError):
+            aspect_ratios["16/9"]["WEBP"]
+        with pytest.raises(KeyError):
+            aspect_ratios["16/9"]["AVIF"][101]
+
+    @pytest.mark.django_db
+    def test_aspect_ratios__save(self, image_upload_file):
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        aspect_ratios = obj.picture.aspect_ratios
+        obj.picture.save("image.png", image_upload_file)
+        assert obj.picture.aspect_ratios is not aspect_ratios
+
+    @pytest.mark.django_db
+    def test_symmetric_difference__same_file(self, image_upload_file):
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        from_field = PictureField(aspect_ratios=[None, "21/9"])
+        from_field.set_attributes_from_name("picture")
+        old = from_field.attr_class(
+            instance=obj, field=from_field, name=obj.picture.name
+        )
+        new, obsolete = obj.picture ^ old
+        assert new == {
+            picture
+            for picture in obj.picture.get_picture_files_list()
+            if picture.aspect_ratio
+        }
+        assert obsolete == set(old.aspect_ratios["21/9"]["AVIF"].values())
+
+    @pytest.mark.django_db
+    def test_symmetric_difference__storage(self, tmp_path, image_upload_file):
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        old = SimpleModel.objects.get(pk=obj.pk).picture
+        old.storage = FileSystemStorage(location=tmp_path)
+        new, obsolete = obj.picture ^ old
+        assert new == obj.picture.get_picture_files_list()
+        assert obsolete == old.get_picture_files_list()
+
+    @pytest.mark.django_db
+    @pytest.mark.benchmark(group="pictures.models.PictureFieldFile.aspect_ratios")
+    def test_aspect_ratios__performance(self, benchmark, image_upload_file):
+        """Benchmark repeated access, like the picture tag and diffs do."""
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        benchmark(lambda: obj.picture ^ obj.picture)
+
     @pytest.mark.django_db
     def test_width(self, stub_worker, image_upload_file):
         obj = SimpleModel(picture=image_upload_file)
@@ -810,6 +1023,123 @@ class TestPictureFieldFile:
         assert obj.picture.width == 3000
         assert obj.picture.height == 2000
 
+    @pytest.mark.django_db
+    def test_dimension_cache(self, settings, monkeypatch, image_upload_file):
+        settings.PICTURES = settings.PICTURES | {"DIMENSION_CACHE": "default"}
+        cache.clear()
+        obj = Profile.objects.create(name="Luke", picture=image_upload_file)
+        storage = obj.picture.storage.deconstruct()
+        assert state.get_dimensions(storage, obj.picture.name) == (800, 800)
+
+        monkeypatch.setattr(probe, "dimensions", Mock(side_effect=AssertionError))
+        obj = Profile.objects.get(pk=obj.pk)
+        assert obj.picture.width == 800
+        assert obj.picture.height == 800
+
+        obj.picture.delete()
+        assert state.get_dimensions(storage, obj.picture.name) is None
+
+    @pytest.mark.django_db
+    def test_dimension_cache__resave(self, settings, image_upload_file):
+        settings.PICTURES = settings.PICTURES | {
+            "DIMENSION_CACHE": "default",
+            "PROCESSOR": "pictures.tasks.noop",
+        }
+        cache.clear()
+        obj = Profile.objects.create(name="Luke", picture=image_upload_file)
+        assert obj.picture.width == 800
+        with io.BytesIO() as output:
+            Image.new("RGB", (300, 100)).save(output, format="PNG")
+            obj.picture.save("b.png", ContentFile(output.getvalue()))
+        assert (obj.picture.width, obj.picture.height) == (300, 100)
+        storage = obj.picture.storage.deconstruct()
+        assert state.get_dimensions(storage, obj.picture.name) == (300, 100)
+        assert Profile.objects.get(pk=obj.pk).picture.width == 300
+
+    @pytest.mark.django_db
+    def test_dimension_cache__fill(self, settings, image_upload_file):
+        obj = Profile.objects.create(name="Luke", picture=image_upload_file)
+        storage = obj.picture.storage.deconstruct()
+        settings.PICTURES = settings.PICTURES | {"DIMENSION_CACHE": "default"}
+        cache.clear()
+        obj = Profile.objects.get(pk=obj.pk)
+        assert obj.picture.width == 800
+        assert state.get_dimensions(storage, obj.picture.name) == (800, 800)
+
+    @pytest.mark.django_db
+    def test_dimension_cache__disabled(self, image_upload_file):
+        obj = Profile.objects.create(name="Luke", picture=image_upload_file)
+        storage = obj.picture.storage.deconstruct()
+        state.set_dimensions(storage, obj.picture.name, (1, 1))
+        assert state.get_dimensions(storage, obj.picture.name) is None
+        obj = Profile.objects.get(pk=obj.pk)
+        assert obj.picture.width == 800
+
+    @pytest.mark.django_db
+    def test_get_processor_options(self, monkeypatch, image_upload_file):
+        obj = JPEGModel.objects.create(picture=image_upload_file)
+        assert obj.picture.get_processor_options() == {}
+        monkeypatch.setattr(obj.picture.field, "deferred_file_types", ["WEBP"])
+        assert obj.picture.get_processor_options() == {"deferred_file_types": ["WEBP"]}
+
+    @pytest.mark.django_db
+    def test_get_processor_options__size_queues(
+        self, monkeypatch, settings, image_upload_file
+    ):
+        obj = JPEGModel.objects.create(picture=image_upload_file)
+        new = obj.picture.get_update_payload()[2]
+        settings.PICTURES = settings.PICTURES | {
+            "SIZE_QUEUES": {"pictures-large": 800 * 800 * len(new)}
+        }
+        assert obj.picture.get_processor_options() == {}
+        assert obj.picture.get_processor_options(new[1:]) == {}
+        assert obj.picture.get_processor_options(new) == {
+            "queue_name": "pictures-large"
+        }
+        monkeypatch.setattr(obj.picture.field, "queue_name", "pictures-jpeg")
+        assert obj.picture.get_processor_options(new[1:]) == {
+            "queue_name": "pictures-jpeg"
+        }
+
+    @pytest.mark.django_db
+    def test_get_ready_file_types(self, monkeypatch, image_upload_file):
+        obj = JPEGModel.objects.create(picture=image_upload_file)
+        assert obj.picture.get_ready_file_types() == {"WEBP", "JPEG"}
+        monkeypatch.setattr(obj.picture.field, "deferred_file_types", ["WEBP"])
+        assert obj.picture.get_ready_file_types() == {"WEBP", "JPEG"}
+
+    @pytest.mark.django_db
+    def test_get_ready_file_types__without_state_cache(self, image_upload_file):
+        obj = JPEGModel.objects.create(picture=image_upload_file)
+        storage = obj.picture.storage.deconstruct()
+        state.set_pending(storage, obj.picture.name, [{"WEBP"}])
+        assert state.get_status(storage, obj.picture.name) == state.READY
+        assert obj.picture.get_ready_file_types() == {"WEBP", "JPEG"}
+
+    @pytest.mark.django_db
+    def test_get_ready_file_types__storage_fallback(
+        self, monkeypatch, settings, image_upload_file
+    ):
+        settings.PICTURES = settings.PICTURES | {"STATE_CACHE": "default"}
+        obj = JPEGModel.objects.create(picture=image_upload_file)
+        monkeypatch.setattr(obj.picture.field, "deferred_file_types", ["WEBP"])
+        cache.clear()
+        assert obj.picture.get_ready_file_types() == {"WEBP", "JPEG"}
+        assert state.get_ready_file_types(
+            obj.picture.storage.deconstruct(), obj.picture.name
+        ) == {"WEBP"}
+
+        cache.clear()
+        for picture in obj.picture.get_picture_files_list():
+            picture.delete()
+        assert obj.picture.get_ready_file_types() == {"JPEG"}
+        storage = obj.picture.storage.deconstruct()
+        assert state.get_missing_file_types(storage, obj.picture.name) == {"WEBP"}
+
+        exists = Mock(side_effect=AssertionError)
+        monkeypatch.setattr(obj.picture.storage, "exists", exists)
+        assert obj.picture.get_ready_file_types() == {"JPEG"}
+
     @pytest.mark.django_db
     def test_update_all__empty(self, stub_worker, image_upload_file):
         obj = SimpleModel()
@@ -1138,6 +1468,298 @@ class TestPictureField:
             "Please add two positive integer fields to 'testapp.Profile'"
         )
 
+    def test_check_width_height_field__dimension_cache(self, settings):
+        settings.PICTURES = settings.PICTURES | {"DIMENSION_CACHE": "default"}
+        assert not Profile.picture.field._check_width_height_field()
+
+    @pytest.mark.django_db
+    def test_update_dimension_fields__loaded(self, image_upload_file):
+        SimpleModel.objects.create(picture=image_upload_file)
+        obj = SimpleModel.objects.get()
+        # the descriptor hasn't been accessed to create a field file
+        assert isinstance(obj.__dict__["picture"], str)
+        assert obj.picture_width == 800
+
+    @pytest.mark.django_db
+    def test_update_dimension_fields__deferred(
+        self, django_assert_num_queries, image_upload_file
+    ):
+        SimpleModel.objects.create(picture=image_upload_file)
+        SimpleModel.objects.update(picture_width=None, picture_height=None)
+        with django_assert_num_queries(1):
+            (obj,) = SimpleModel.objects.only("pk", "picture")
+        assert isinstance(obj.__dict__["picture"], str)
+
+    @pytest.mark.django_db
+    def test_update_dimension_fields__missing(self, image_upload_file):
+        SimpleModel.objects.create(picture=image_upload_file)
+        SimpleModel.objects.update(picture_width=None, picture_height=None)
+        obj = SimpleModel.objects.get()
+        assert obj.picture_width == 800
+        assert obj.picture_height == 800
+
+    @pytest.mark.django_db
+    def test_update_dimension_fields__missing__new_files_only(
+        self, settings, monkeypatch, image_upload_file
+    ):
+        settings.PICTURES = settings.PICTURES | {"UPDATE_DIMENSIONS_ON_INIT": False}
+        obj = SimpleModel(picture=image_upload_file)
+        assert obj.picture_width == 800
+        obj.save()
+        SimpleModel.objects.update(picture_width=None, picture_height=None)
+        dimensions = Mock(wraps=probe.dimensions)
+        monkeypatch.setattr(probe, "dimensions", dimensions)
+        obj = SimpleModel.objects.get()
+        assert obj.picture_width is None
+        assert not dimensions.called
+        # width and height are read lazily
+        assert obj.picture.width == 800
+        assert dimensions.called
+
+    @pytest.fixture
+    def queryset(self):
+        SimpleModel.objects.bulk_create(
+            SimpleModel(
+                picture="testapp/simplemodel/image.png",
+                picture_width=800,
+                picture_height=600,
+            )
+            for _ in range(1000)
+        )
+        return SimpleModel.objects.all()
+
+    @pytest.mark.django_db
+    @pytest.mark.benchmark(group="pictures.models.PictureField.update_dimension_fields")
+    def test_update_dimension_fields__performance(self, benchmark, queryset):
+        """Benchmark queryset iteration, which sends post_init for each row."""
+        benchmark(lambda: list(queryset.all()))
+
+    @pytest.mark.django_db
+    @pytest.mark.benchmark(group="pictures.models.PictureField.update_dimension_fields")
+    def test_update_dimension_fields__performance__org(self, benchmark, queryset):
+        """Benchmark queryset iteration with Django's ImageField implementation."""
+        field = SimpleModel._meta.get_field("picture")
+        receiver = types.MethodType(ImageField.update_dimension_fields, field)
+        post_init.disconnect(field.update_dimension_fields, sender=SimpleModel)
+        post_init.connect(receiver, sender=SimpleModel, weak=False)
+        try:
+            benchmark(lambda: list(queryset.all()))
+        finally:
+            post_init.disconnect(receiver, sender=SimpleModel)
+            post_init.connect(field.update_dimension_fields, sender=SimpleModel)
+
+    @pytest.mark.django_db
+    @pytest.mark.benchmark(group="pictures.models.PictureField.update_dimension_fields")
+    def test_update_dimension_fields__performance__disconnected(
+        self, benchmark, queryset
+    ):
+        """Benchmark queryset iteration without any post_init receiver."""
+        field = SimpleModel._meta.get_field("picture")
+        post_init.disconnect(field.update_dimension_fields, sender=SimpleModel)
+        try:
+            benchmark(lambda: list(queryset.all()))
+        finally:
+            post_init.connect(field.update_dimension_fields, sender=SimpleModel)
+
     def test_check(self):
         assert not SimpleModel._meta.get_field("picture").check()
         assert Profile._meta.get_field("picture").check()
+
+    def test_check_deferred_file_types(self, settings):
+        settings.PICTURES = settings.PICTURES | {"STATE_CACHE": "default"}
+        assert not PictureField(
+            file_types=["WEBP", "AVIF"], deferred_file_types=["AVIF"]
+        )._check_deferred_file_types()
+        errors = PictureField(
+            file_types=["WEBP"], deferred_file_types=["AVIF"]
+        )._check_deferred_file_types()
+        assert errors
+        assert errors[0].id == "fields.E102"
+        settings.PICTURES = settings.PICTURES | {"STATE_CACHE": None}
+        errors = PictureField(
+            file_types=["WEBP", "AVIF"], deferred_file_types=["AVIF"]
+        )._check_deferred_file_types()
+        assert errors
+        assert errors[0].id == "fields.E103"
+
+    def test_deconstruct__deferred_file_types(self):
+        *_, kwargs = PictureField().deconstruct()
+        assert "deferred_file_types" not in kwargs
+        *_, kwargs = PictureField(
+            file_types=["WEBP", "AVIF"], deferred_file_types=["AVIF"]
+        ).deconstruct()
+        assert kwargs["deferred_file_types"] == ["AVIF"]
+
+    def test_spec(self):
+        field = PictureField(aspect_ratios=[None, "3/2"], file_types=["WEBP"])
+        spec = field.spec
+        assert field.spec is spec
+        assert spec.picture_class is PillowPicture
+        assert spec.aspect_ratios == ((None, None), ("3/2", Fraction(3, 2)))
+        assert spec.file_types == ("WEBP",)
+        assert set(spec.source_set((800, 800), Fraction(3, 2))) == utils.source_set(
+            (800, 800), ratio="3/2", max_width=1200, cols=12
+        )
+        assert spec.sizes == utils.sizes(field=field, container_width=1200)
+
+    def test_spec__setattr(self):
+        field = PictureField()
+        spec = field.spec
+        field.file_types = ["AVIF", "WEBP"]
+        assert field.spec is not spec
+        assert field.spec.file_types == ("AVIF", "WEBP")
+
+    def test_spec__setting_changed(self, settings):
+        field = PictureField()
+        spec = field.spec
+        settings.PICTURES = settings.PICTURES | {"PIXEL_DENSITIES": [1]}
+        assert field.spec is not spec
+        assert field.spec.pixel_densities == (1,)
+
+    def test_spec__processor(self, settings):
+        settings.PICTURES = settings.PICTURES | {"PROCESSOR": "pictures.tasks.noop"}
+        assert PictureField().spec.processor is tasks.noop
+
+    def test_spec__get_sizes(self, monkeypatch):
+        field = Profile._meta.get_field("picture")
+        assert field.spec.get_sizes(field.container_width) is field.spec.sizes
+        sizes = Mock(wraps=utils.sizes)
+        monkeypatch.setattr(utils, "sizes", sizes)
+        assert field.spec.get_sizes(800, s=6) == (
+            "(min-width: 0px) and (max-width: 767px) 100vw,"
+            " (min-width: 768px) and (max-width: 799px) 50vw, 400px"
+        )
+        assert field.spec.get_sizes(800, s=6) == field.spec.get_sizes(800, s=6)
+        assert sizes.call_count == 1
+        with pytest.raises(KeyError):
+            field.spec.get_sizes(800, not_a_breakpoint=6)
+
+    def test_spec__get_sizes__max_sizes(self, monkeypatch):
+        field = Profile._meta.get_field("picture")
+        monkeypatch.setattr(type(field.spec), "max_sizes", 1)
+        field.spec.get_sizes(800, s=6)
+        field.spec.get_sizes(800, s=4)
+        assert len(field.spec._sizes) == 1
+
+    def test_spec__diff(self):
+        spec = Profile._meta.get_field("picture").spec
+        other = PictureField(aspect_ratios=[None, "21/9"]).spec
+        new, obsolete = spec.diff(other, (800, 600), (800, 600))
+        assert {fraction for fraction, _, _ in new} == {
+            Fraction(1),
+            Fraction(3, 2),
+            Fraction(16, 9),
+        }
+        assert {fraction for fraction, _, _ in obsolete} == {Fraction(21, 9)}
+        assert spec.diff(other, (800, 600), (800, 600)) is spec.diff(
+            other, (800, 600), (800, 600)
+        )
+        new, obsolete = spec.diff(other, (800, 600), (400, 300))
+        assert (None, "AVIF", 500) in new
+        assert (None, "AVIF", 400) not in new
+        assert (Fraction(7, 3), "AVIF", 500) not in obsolete
+        assert spec.diff(spec, (800, 600), (800, 600)) == ([], [])
+
+    def test_spec__diff__max_diffs(self, monkeypatch):
+        spec = Profile._meta.get_field("picture").spec
+        monkeypatch.setattr(type(spec), "max_diffs", 1)
+        spec._diffs.clear()
+        spec.diff(spec, (800, 600), (800, 600))
+        spec.diff(spec, (400, 300), (400, 300))
+        assert len(spec._diffs) == 1
+
+
+class TestPrefetchPictures:
+    @pytest.mark.django_db
+    def test_prefetch_pictures(self, monkeypatch, image_upload_file):
+        for _ in range(3):
+            SimpleModel.objects.create(picture=image_upload_file)
+        SimpleModel.objects.create()
+        objs = list(SimpleModel.objects.all())
+        get_many = Mock(wraps=state.get_many)
+        monkeypatch.setattr(state, "get_many", get_many)
+        assert prefetch_pictures(objs, "picture", "16/9") == objs
+        get_many.assert_called_once()
+        assert len(get_many.call_args.args[1]) == 3
+
+        get_status = Mock(side_effect=AssertionError)
+        monkeypatch.setattr(state, "get_status", get_status)
+        url = Mock(side_effect=AssertionError)
+        monkeypatch.setattr(default_storage, "url", url)
+        assert objs[0].picture.get_ready_file_types() == {"AVIF"}
+        assert objs[0].picture.url.startswith("/media/testapp/simplemodel/image")
+        assert objs[0].picture.aspect_ratios["16/9"]["AVIF"][100].url
+
+    @pytest.mark.django_db
+    def test_prefetch_pictures__state(self, settings, image_upload_file):
+        settings.PICTURES = settings.PICTURES | {"STATE_CACHE": "default"}
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        storage = obj.picture.storage.deconstruct()
+        state.set_pending(storage, obj.picture.name, [{"AVIF"}])
+        (obj,) = prefetch_pictures(SimpleModel.objects.all(), "picture")
+        assert obj.picture.get_ready_file_types() == set()
+
+    @pytest.mark.django_db
+    def test_prefetch_pictures__dimensions(self, settings, image_upload_file):
+        settings.PICTURES = settings.PICTURES | {"DIMENSION_CACHE": "default"}
+        Profile.objects.create(name="Luke", picture=image_upload_file)
+        (obj,) = prefetch_pictures(Profile.objects.all(), "picture")
+        assert obj.picture._dimensions_cache == (800, 800)
+
+    @pytest.mark.django_db
+    def test_prefetch_pictures__invalid_ratio(self, image_upload_file):
+        SimpleModel.objects.create(picture=image_upload_file)
+        with pytest.raises(ValueError) as e:
+            prefetch_pictures(SimpleModel.objects.all(), "picture", "1/1")
+        assert str(e.value) == "Invalid ratio: 1/1. Choices are: 3/2, 16/9"
+
+    @pytest.mark.django_db
+    def test_prefetch_pictures__save(self, image_upload_file):
+        SimpleModel.objects.create(picture=image_upload_file)
+        (obj,) = prefetch_pictures(SimpleModel.objects.all(), "picture")
+        obj.picture.save("other.png", image_upload_file)
+        assert "_ready_file_types_cache" not in obj.picture.__dict__
+        assert obj.picture.url.startswith("/media/testapp/simplemodel/other")
+
+    @pytest.mark.django_db
+    def test_with_pictures(self, image_upload_file):
+        SimpleModel.objects.create(picture=image_upload_file)
+        queryset = PictureQuerySet(model=SimpleModel).with_pictures(
+            "picture", "16/9", container=800
+        )
+        (obj,) = queryset.filter(picture__isnull=False)
+        assert "_ready_file_types_cache" in obj.picture.__dict__
+        (obj,) = queryset.all().iterator()
+        assert "_ready_file_types_cache" not in obj.picture.__dict__
+        assert list(queryset.values_list("picture", flat=True))
+
+    @pytest.mark.django_db
+    @pytest.mark.benchmark(group="pictures.templatetags.pictures.picture")
+    def test_picture__performance(self, settings, benchmark, image_upload_file):
+        """Benchmark rendering a grid of pictures."""
+        # rendering doesn't depend on the picture files
+        settings.PICTURES = settings.PICTURES | {"PROCESSOR": "pictures.tasks.noop"}
+        for _ in range(20):
+            SimpleModel.objects.create(picture=image_upload_file)
+        template = Template(
+            "{% load pictures %}{% for obj in objs %}"
+            '{% picture obj.picture ratio="16/9" %}{% endfor %}'
+        )
+        benchmark(lambda: template.render(Context({"objs": SimpleModel.objects.all()})))
+
+    @pytest.mark.django_db
+    @pytest.mark.benchmark(group="pictures.templatetags.pictures.picture")
+    def test_picture__performance__with_pictures(
+        self, settings, benchmark, image_upload_file
+    ):
+        """Benchmark rendering a grid of prefetched pictures."""
+        # rendering doesn't depend on the picture files
+        settings.PICTURES = settings.PICTURES | {"PROCESSOR": "pictures.tasks.noop"}
+        for _ in range(20):
+            SimpleModel.objects.create(picture=image_upload_file)
+        template = Template(
+            "{% load pictures %}{% for obj in objs %}"
+            '{% picture obj.picture ratio="16/9" %}{% endfor %}'
+        )
+        queryset = PictureQuerySet(model=SimpleModel).with_pictures("picture", "16/9")
+        benchmark(lambda: template.render(Context({"objs": queryset.all()})))
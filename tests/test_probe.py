@@ -0,0 +1,129 @@
+import io
+import os
+import struct
+
+import pytest
+from PIL import Image, UnidentifiedImageError
+
+from pictures import probe
+
+
+class CountingFile(io.BytesIO):
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def encode(file_type, orientation=None, size=(1200, 900), **options):
+    img = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        options["exif"] = exif
+    with io.BytesIO() as output:
+        img.save(output, format=file_type, **options)
+        return output.getvalue()
+
+
+def box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, payload, version=0, flags=0):
+    return box(box_type, bytes([version]) + flags.to_bytes(3, "big") + payload)
+
+
+def heif(rotation=0, padding=0):
+    properties = box(
+        b"ipco",
+        full_box(b"ispe", struct.pack(">II", 512, 512))
+        + full_box(b"ispe", struct.pack(">II", 4032, 3024))
+        + box(b"irot", bytes([rotation])),
+    )
+    associations = full_box(
+        b"ipma",
+        struct.pack(">I", 2)
+        # a grid tile of the primary item
+        + struct.pack(">HBB", 2, 1, 0x81)
+        # the primary item
+        + struct.pack(">HBBB", 1, 2, 0x82, 0x03),
+    )
+    return (
+        box(b"ftyp", b"heic" + bytes(4) + b"mif1heic")
+        + box(b"free", bytes(padding))
+        + full_box(
+            b"meta",
+            full_box(b"pitm", struct.pack(">H", 1))
+            + box(b"iprp", properties + associations),
+        )
+        + box(b"mdat", bytes(100_000))
+    )
+
+
+@pytest.mark.parametrize(
+    ("file_type", "options"),
+    [
+        ("JPEG", {}),
+        ("PNG", {}),
+        ("WEBP", {}),
+        ("WEBP", {"lossless": True}),
+        ("AVIF", {}),
+        ("GIF", {}),
+    ],
+)
+def test_dimensions(file_type, options):
+    file = CountingFile(encode(file_type, **options))
+    assert probe.dimensions(file) == (1200, 900)
+    assert file.bytes_read == probe.CHUNK_SIZE
+
+
+@pytest.mark.parametrize("file_type", ["JPEG", "PNG", "WEBP", "AVIF"])
+def test_dimensions__exif_orientation(file_type):
+    file = CountingFile(encode(file_type, orientation=6))
+    assert probe.dimensions(file) == (900, 1200)
+    assert file.bytes_read < probe.CHUNK_SIZE * 2
+    file = CountingFile(encode(file_type, orientation=3))
+    assert probe.dimensions(file) == (1200, 900)
+
+
+def test_dimensions__webp_exif_after_image_data():
+    data = encode("WEBP", orientation=8)
+    assert data.rindex(b"EXIF") > probe.CHUNK_SIZE
+    file = CountingFile(data)
+    assert probe.dimensions(file) == (900, 1200)
+    assert file.bytes_read < probe.CHUNK_SIZE + 100
+
+
+def test_dimensions__heif():
+    file = CountingFile(heif())
+    assert probe.dimensions(file) == (4032, 3024)
+    assert file.bytes_read == probe.CHUNK_SIZE
+    assert probe.dimensions(io.BytesIO(heif(rotation=1))) == (3024, 4032)
+    assert probe.dimensions(io.BytesIO(heif(rotation=2))) == (4032, 3024)
+
+
+def test_dimensions__growing_reads():
+    file = CountingFile(heif(padding=10_000))
+    assert probe.dimensions(file) == (4032, 3024)
+    assert file.bytes_read == probe.CHUNK_SIZE * 4
+
+
+def test_dimensions__small_file():
+    file = CountingFile(encode("PNG", size=(2, 3)))
+    assert probe.dimensions(file) == (2, 3)
+
+
+def test_dimensions__seek_start():
+    file = io.BytesIO(encode("JPEG"))
+    file.seek(42)
+    assert probe.dimensions(file) == (1200, 900)
+
+
+def test_dimensions__invalid():
+    with pytest.raises(UnidentifiedImageError):
+        probe.dimensions(io.BytesIO(b"not an image" * 1000))
+    with pytest.raises(UnidentifiedImageError):
+        probe.dimensions(io.BytesIO(b""))
@@ -0,0 +1,60 @@
+import contextlib
+
+import pytest
+
+from pictures import signals
+
+spans = []
+
+
+@contextlib.contextmanager
+def start_span(name, attributes):
+    spans.append((name, attributes))
+    yield
+
+
+class TestTrace:
+    def test_signal(self):
+        events = []
+
+        def receiver(sender, **kwargs):
+            events.append((sender, kwargs))
+
+        signals.stage_processed.connect(receiver)
+        try:
+            with signals.trace("sender", "decode", width=100):
+                pass
+        finally:
+            signals.stage_processed.disconnect(receiver)
+
+        assert len(events) == 1
+        sender, kwargs = events[0]
+        assert sender == "sender"
+        assert kwargs["stage"] == "decode"
+        assert kwargs["duration"] >= 0
+        assert kwargs["exception"] is None
+        assert kwargs["tags"] == {"width": 100}
+
+    def test_signal__exception(self):
+        events = []
+
+        def receiver(sender, **kwargs):
+            events.append(kwargs)
+
+        signals.stage_processed.connect(receiver)
+        try:
+            with pytest.raises(OSError), signals.trace("sender", "write"):
+                raise OSError("storage unavailable")
+        finally:
+            signals.stage_processed.disconnect(receiver)
+
+        assert isinstance(events[0]["exception"], OSError)
+
+    def test_tracer(self, settings):
+        spans.clear()
+        settings.PICTURES = settings.PICTURES | {
+            "TRACER": "tests.test_signals.start_span"
+        }
+        with signals.trace("sender", "encode", file_type="AVIF", aspect_ratio=None):
+            pass
+        assert spans == [("pictures.encode", {"file_type": "AVIF"})]
@@ -1,12 +1,24 @@
+import asyncio
 import importlib
+import json
+import os
+import pstats
+import subprocess  # noqa: S404
+import sys
+import threading
 from unittest.mock import Mock
 
 import pytest
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from PIL import UnidentifiedImageError
 
-from pictures import tasks
+from pictures import signals, state, tasks
+from pictures.models import PillowPicture
 from pictures.tasks import _process_picture
-from tests.testapp.models import SimpleModel
+from pictures.templatetags.pictures import picture as picture_tag
+from tests.testapp.models import JPEGModel, Profile, SimpleModel
 
 
 @pytest.mark.django_db
@@ -39,6 +51,7 @@ def test_django_tasks_misconfiguration(settings):
             "QUEUES": ["default"],
         }
     }
+    sys.modules.pop("pictures.contrib.django_tasks", None)
     with pytest.raises(ImproperlyConfigured) as e:
         importlib.reload(tasks)
     assert str(e.value) == (
@@ -59,9 +72,100 @@ def test_django_tasks_misconfiguration__different_processor(settings):
         }
     }
     settings.PICTURES = settings.PICTURES | {"PROCESSOR": "pictures.tasks.noop"}
+    sys.modules.pop("pictures.contrib.django_tasks", None)
     importlib.reload(tasks)
 
 
+def test_getattr__default(monkeypatch):
+    monkeypatch.setattr(tasks, "_get_default_integration", lambda: None)
+    monkeypatch.delitem(vars(tasks), "process_picture", raising=False)
+    assert tasks.process_picture is tasks._process_picture
+    assert vars(tasks)["process_picture"] is tasks._process_picture
+
+
+def test_getattr__integration(monkeypatch):
+    importlib_mock = Mock()
+    monkeypatch.setattr(tasks, "importlib", importlib_mock)
+    monkeypatch.delitem(vars(tasks), "rq_process_picture", raising=False)
+    assert tasks.rq_process_picture is (
+        importlib_mock.import_module.return_value.rq_process_picture
+    )
+    importlib_mock.import_module.assert_called_once_with("pictures.contrib.django_rq")
+
+
+def test_getattr__unknown():
+    with pytest.raises(AttributeError) as e:
+        tasks.does_not_exist  # noqa: B018
+    assert str(e.value) == "module 'pictures.tasks' has no attribute 'does_not_exist'"
+
+
+def test_load_configured_integrations(monkeypatch, settings):
+    """Only import the integrations named in the processor settings."""
+    importlib_mock = Mock()
+    monkeypatch.setattr(tasks, "importlib", importlib_mock)
+    monkeypatch.delitem(vars(tasks), "celery_process_picture", raising=False)
+    monkeypatch.delitem(vars(tasks), "celery_process_pictures", raising=False)
+    settings.PICTURES = settings.PICTURES | {
+        "PROCESSOR": "pictures.tasks.celery_process_picture",
+        "BATCH_PROCESSOR": "pictures.tasks.celery_process_pictures",
+    }
+    tasks._load_configured_integrations()
+    assert {call.args for call in importlib_mock.import_module.call_args_list} == {
+        ("pictures.contrib.celery",)
+    }
+
+
+def test_load_configured_integrations__partially_initialized(monkeypatch):
+    """Workers may import an integration, which imports this module in turn."""
+    importlib_mock = Mock()
+    importlib_mock.import_module.return_value = type(sys)("pictures.contrib.dramatiq")
+    monkeypatch.setattr(tasks, "importlib", importlib_mock)
+    tasks._load_configured_integrations()
+    importlib_mock.import_module.assert_called_with("pictures.contrib.django_tasks")
+
+
+def test_get_batch_processor(monkeypatch, settings):
+    """Send batches via the integration of the configured processor."""
+    importlib_mock = Mock()
+    monkeypatch.setattr(tasks, "importlib", importlib_mock)
+    settings.PICTURES = settings.PICTURES | {
+        "PROCESSOR": "pictures.tasks.celery_process_picture",
+    }
+    assert (
+        tasks._get_batch_processor()
+        is importlib_mock.import_module.return_value.process_pictures
+    )
+    importlib_mock.import_module.assert_called_once_with("pictures.contrib.celery")
+
+    importlib_mock.reset_mock()
+    settings.PICTURES = settings.PICTURES | {
+        "PROCESSOR": "pictures.contrib.dramatiq.process_picture",
+    }
+    tasks._get_batch_processor()
+    importlib_mock.import_module.assert_called_once_with("pictures.contrib.dramatiq")
+
+    settings.PICTURES = settings.PICTURES | {
+        "PROCESSOR": "pictures.tasks.threaded_process_picture",
+        "BATCH_PROCESSOR": "pictures.tasks.noop",
+    }
+    assert tasks._get_batch_processor() is tasks.noop
+
+
+@pytest.mark.benchmark(group="pictures.tasks")
+def test_import__performance(benchmark):
+    """Benchmark the startup time of a process importing pictures.tasks."""
+    benchmark(
+        subprocess.run,
+        [
+            sys.executable,
+            "-c",
+            "import django; django.setup(); import pictures.tasks",
+        ],
+        check=True,
+        env=os.environ | {"DJANGO_SETTINGS_MODULE": "tests.testapp.settings"},
+    )
+
+
 @pytest.mark.django_db
 @pytest.mark.benchmark(group="pictures.tasks._process_picture")
 def test_process_picture__performance(benchmark, large_image_upload_file):
@@ -76,3 +180,606 @@ def test_process_picture__performance(benchmark, large_image_upload_file):
         obj.picture.name,
         pictures,
     )
+
+
+@pytest.mark.django_db
+def test_process_many(monkeypatch, image_upload_file):
+    SimpleModel.objects.create(picture=image_upload_file)
+    SimpleModel.objects.create(picture=image_upload_file)
+    SimpleModel.objects.create()
+    processor = Mock()
+    monkeypatch.setattr(tasks, "process_pictures", processor)
+    assert tasks.process_many(SimpleModel.objects.all(), "picture", batch_size=1) == 2
+    assert processor.call_count == 2
+    (batch,) = processor.call_args.args
+    ((storage, file_name, new, old),) = batch
+    assert file_name.startswith("testapp/simplemodel/image")
+    assert len(new) == 24
+    assert old == []
+
+
+@pytest.mark.django_db
+def test_process_many__queues(
+    monkeypatch, settings, image_upload_file, tiny_image_upload_file
+):
+    settings.PICTURES = settings.PICTURES | {"PROCESSOR": "pictures.tasks.noop"}
+    SimpleModel.objects.create(picture=image_upload_file)
+    SimpleModel.objects.create(picture=tiny_image_upload_file)
+    SimpleModel.objects.create(picture=image_upload_file)
+    settings.PICTURES = settings.PICTURES | {
+        "SIZE_QUEUES": {"pictures-large": 800 * 800},
+    }
+    processor = Mock()
+    monkeypatch.setattr(tasks, "process_pictures", processor)
+    assert tasks.process_many(SimpleModel.objects.all(), "picture", batch_size=2) == 3
+    calls = processor.call_args_list
+    assert [len(call.args[0]) for call in calls] == [2, 1]
+    assert calls[0].kwargs == {"queue_name": "pictures-large"}
+    assert calls[1].kwargs == {}
+
+
+@pytest.mark.django_db
+def test_process_many__field_files(image_upload_file):
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    picture = obj.picture.aspect_ratios["16/9"]["AVIF"][100]
+    picture.delete()
+    assert not picture.path.exists()
+    assert tasks.process_many([obj.picture, SimpleModel().picture]) == 1
+    assert picture.path.exists()
+
+
+@pytest.mark.django_db
+def test_process_pictures__share_storage(monkeypatch, image_upload_file):
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    reconstruct = Mock(wraps=tasks.utils.reconstruct)
+    monkeypatch.setattr(tasks.utils, "reconstruct", reconstruct)
+    tasks._process_pictures([obj.picture.get_update_payload()] * 2)
+    memos = {id(call.kwargs["memo"]) for call in reconstruct.call_args_list}
+    assert len(memos) == 1
+
+
+@pytest.mark.django_db
+def test_process_pictures__error(caplog, settings, image_upload_file):
+    settings.PICTURES = settings.PICTURES | {"STATE_CACHE": "default"}
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    picture = obj.picture.aspect_ratios["16/9"]["AVIF"][100]
+    picture.delete()
+    storage, file_name, new, old = obj.picture.get_update_payload()
+    tasks._process_pictures([
+        (storage, "does-not-exist.png", new, old),
+        (storage, file_name, new, old),
+    ])
+    assert "Failed to process 'does-not-exist.png'." in caplog.text
+    assert state.get_status(storage, "does-not-exist.png") == state.FAILED
+    assert picture.path.exists()
+
+
+def _picture(file_type, ratio, width):
+    return PillowPicture(
+        "image.png", file_type, ratio, default_storage, width
+    ).deconstruct()
+
+
+class TestFanOut:
+    new = [
+        _picture("AVIF", None, 800),
+        _picture("WEBP", "3/2", 100),
+        _picture("AVIF", None, 100),
+        _picture("AVIF", None, 1600),
+    ]
+    old = [_picture("JPEG", None, 100)]
+
+    def test_default(self):
+        assert tasks._fan_out(self.new, self.old) == [
+            (
+                "pictures",
+                [self.new[1], self.new[2], self.new[0], self.new[3]],
+                self.old,
+            )
+        ]
+
+    def test_default__only_old(self):
+        assert tasks._fan_out([], self.old) == [("pictures", [], self.old)]
+
+    def test_file_type(self, settings):
+        settings.PICTURES = settings.PICTURES | {"FAN_OUT": "file_type"}
+        assert tasks._fan_out(self.new, self.old) == [
+            ("pictures", [self.new[1]], []),
+            ("pictures", [self.new[2], self.new[0], self.new[3]], self.old),
+        ]
+
+    def test_width(self, settings):
+        settings.PICTURES = settings.PICTURES | {
+            "FAN_OUT": "width",
+            "PRIORITY_QUEUE_NAME": "pictures-priority",
+        }
+        assert tasks._fan_out(self.new, self.old) == [
+            ("pictures-priority", [self.new[1], self.new[2]], []),
+            ("pictures", [self.new[0]], []),
+            ("pictures", [self.new[3]], self.old),
+        ]
+
+    def test_deferred_file_types(self, settings):
+        settings.PICTURES = settings.PICTURES | {
+            "DEFERRED_QUEUE_NAME": "pictures-deferred",
+        }
+        assert tasks._fan_out(self.new, self.old, deferred_file_types=["AVIF"]) == [
+            ("pictures", [self.new[1]], []),
+            (
+                "pictures-deferred",
+                [self.new[2], self.new[0], self.new[3]],
+                self.old,
+            ),
+        ]
+
+    def test_queue_name(self, settings):
+        settings.PICTURES = settings.PICTURES | {
+            "FAN_OUT": "width",
+            "PRIORITY_QUEUE_NAME": "pictures-priority",
+        }
+        assert tasks._fan_out(self.new, self.old, queue_name="pictures-large") == [
+            ("pictures-priority", [self.new[1], self.new[2]], []),
+            ("pictures-large", [self.new[0]], []),
+            ("pictures-large", [self.new[3]], self.old),
+        ]
+
+
+def test_dispatch():
+    enqueue = Mock()
+    new = [_picture("AVIF", None, 100)]
+    tasks._dispatch(enqueue, default_storage.deconstruct(), "image.png", new)
+    enqueue.assert_called_once_with(
+        "pictures",
+        storage=default_storage.deconstruct(),
+        file_name="image.png",
+        new=new,
+        old=[],
+    )
+
+
+@pytest.mark.django_db
+def test_dispatch__pending(
+    settings, django_capture_on_commit_callbacks, image_upload_file
+):
+    cache.clear()
+    settings.PICTURES = settings.PICTURES | {
+        "FAN_OUT": "file_type",
+        "STATE_CACHE": "default",
+    }
+    obj = JPEGModel.objects.create(picture=image_upload_file)
+    storage, file_name, new, old = obj.picture.get_update_payload()
+    calls = []
+    processed = []
+
+    def receiver(sender, **kwargs):
+        processed.append(kwargs["status"])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tasks._dispatch(
+            lambda queue_name, **kwargs: calls.append(kwargs),
+            storage,
+            file_name,
+            new,
+            old,
+        )
+    assert len(calls) == 6
+    assert state.get_status(storage, file_name) == state.PENDING
+    assert obj.picture.get_ready_file_types() == set()
+
+    signals.picture_processed.connect(receiver)
+    try:
+        for i, kwargs in enumerate(calls[:-1]):
+            tasks._process_picture(**kwargs)
+            remaining = {
+                picture[1][1] for call in calls[i + 1 :] for picture in call["new"]
+            }
+            assert state.get_status(storage, file_name) == state.PENDING
+            assert obj.picture.get_ready_file_types() == {"WEBP", "JPEG"} - remaining
+        assert not processed
+        tasks._process_picture(**calls[-1])
+    finally:
+        signals.picture_processed.disconnect(receiver)
+    assert state.get_status(storage, file_name) == state.READY
+    assert obj.picture.get_ready_file_types() == {"WEBP", "JPEG"}
+    assert processed == [state.READY]
+
+
+@pytest.mark.django_db
+def test_process_picture__failed(monkeypatch, settings, image_upload_file):
+    settings.PICTURES = settings.PICTURES | {"RETRIES": 0, "STATE_CACHE": "default"}
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    cache.clear()
+    storage, file_name, new, old = obj.picture.get_update_payload()
+    processed = []
+
+    def receiver(sender, **kwargs):
+        processed.append(kwargs["status"])
+
+    signals.picture_processed.connect(receiver)
+    try:
+        with monkeypatch.context() as m:
+            m.setattr(PillowPicture, "save", Mock(side_effect=OSError))
+            with pytest.raises(OSError):
+                tasks._process_picture(storage, file_name, new, old)
+        assert state.get_status(storage, file_name) == state.FAILED
+        assert obj.picture.get_ready_file_types() == set()
+
+        tasks._process_picture(storage, file_name, new, old)
+    finally:
+        signals.picture_processed.disconnect(receiver)
+    assert state.get_status(storage, file_name) == state.READY
+    assert processed == [state.FAILED, state.READY]
+
+
+@pytest.mark.django_db
+def test_process_picture__state_timeout(monkeypatch, settings, image_upload_file):
+    settings.PICTURES = settings.PICTURES | {
+        "RETRIES": 0,
+        "STATE_CACHE": "default",
+        "STATE_TIMEOUT": 60,
+    }
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    storage, file_name, new, old = obj.picture.get_update_payload()
+    set_ = Mock(wraps=cache.set)
+    monkeypatch.setattr(cache, "set", set_)
+    with monkeypatch.context() as m:
+        m.setattr(PillowPicture, "save", Mock(side_effect=OSError))
+        with pytest.raises(OSError):
+            tasks._process_picture(storage, file_name, new, old)
+    assert state.get_status(storage, file_name) == state.FAILED
+    state.add_ready_file_types(storage, file_name, {"AVIF"})
+    assert {call.kwargs["timeout"] for call in set_.call_args_list} == {60}
+
+    obj.picture.delete()
+    assert state.get_status(storage, file_name) == state.READY
+    assert state.get_ready_file_types(storage, file_name) is None
+
+
+@pytest.mark.django_db
+def test_process_picture__add_ready_file_types(settings, image_upload_file):
+    settings.PICTURES = settings.PICTURES | {"STATE_CACHE": "default"}
+    obj = JPEGModel.objects.create(picture=image_upload_file)
+    storage = obj.picture.storage.deconstruct()
+    cache.clear()
+    assert state.get_ready_file_types(storage, obj.picture.name) is None
+    tasks._process_picture(*obj.picture.get_update_payload())
+    assert state.get_ready_file_types(storage, obj.picture.name) == {"WEBP", "JPEG"}
+
+
+@pytest.mark.django_db
+def test_process_picture__set_dimensions(settings, large_image_upload_file):
+    settings.PICTURES = settings.PICTURES | {
+        "DIMENSION_CACHE": "default",
+        "PROCESSOR": "pictures.tasks.noop",
+    }
+    obj = Profile.objects.create(picture=large_image_upload_file)
+    storage, file_name, new, old = obj.picture.get_update_payload()
+    cache.clear()
+    # a single picture is enough to pre-process the source
+    tasks._process_picture(storage, file_name, new[:1], old)
+    # the source is rotated by EXIF orientation
+    assert state.get_dimensions(storage, obj.picture.name) == (3000, 2000)
+
+
+@pytest.mark.django_db
+def test_process_picture__stage_processed(image_upload_file):
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    stages = []
+
+    def receiver(sender, stage, tags, **kwargs):
+        stages.append((stage, tags))
+
+    signals.stage_processed.connect(receiver)
+    try:
+        _process_picture(*obj.picture.get_update_payload())
+    finally:
+        signals.stage_processed.disconnect(receiver)
+
+    assert [stage for stage, _ in stages[:3]] == ["open", "decode", "pre_process"]
+    assert stages[1][1] == {"file_name": obj.picture.name, "source_pixels": 800 * 800}
+    assert [stage for stage, _ in stages[3:6]] == ["resize", "encode", "write"]
+    count = len(obj.picture.get_picture_files_list())
+    assert len(stages) == 3 + 3 * count + 1
+    assert stages[-1] == ("process", {"file_name": obj.picture.name, "pictures": count})
+    assert stages[5][1]["file_type"] in obj.picture.field.file_types
+    assert stages[5][1]["source_pixels"] == 800 * 800
+    assert stages[5][1]["bytes_written"] > 0
+
+
+@pytest.mark.django_db
+def test_process_picture__profile(settings, tmp_path, image_upload_file):
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    settings.PICTURES = settings.PICTURES | {
+        "PROFILE_THRESHOLD": 0,
+        "PROFILE_DIR": tmp_path,
+    }
+    _process_picture(*obj.picture.get_update_payload())
+    (profile,) = tmp_path.glob("*.prof")
+    assert pstats.Stats(str(profile)).total_calls
+    metadata = json.loads(profile.with_suffix(".json").read_text())
+    assert metadata["file_name"] == obj.picture.name
+    assert metadata["duration"] > 0
+    assert metadata["width"] == 800
+    assert metadata["height"] == 800
+    assert metadata["format"] == "PNG"
+    assert metadata["mode"] == "RGBA"
+    assert metadata["icc_profile"] is False
+    assert metadata["pictures"] == len(obj.picture.get_picture_files_list())
+
+
+@pytest.mark.django_db
+def test_process_picture__profile__fast(settings, tmp_path, image_upload_file):
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    settings.PICTURES = settings.PICTURES | {
+        "PROFILE_THRESHOLD": 60,
+        "PROFILE_DIR": tmp_path,
+    }
+    _process_picture(*obj.picture.get_update_payload())
+    assert not list(tmp_path.iterdir())
+
+
+def test_save_picture(monkeypatch, settings):
+    settings.PICTURES = settings.PICTURES | {"RETRIES": 2}
+    sleep = Mock()
+    monkeypatch.setattr(tasks.time, "sleep", sleep)
+    picture = Mock()
+    picture.save.side_effect = [OSError("flaky storage"), OSError("again"), None]
+    tasks._save_picture(picture, Mock())
+    assert picture.save.call_count == 3
+    assert [call.args for call in sleep.call_args_list] == [(1,), (2,)]
+
+
+def test_save_picture__raise(monkeypatch, settings):
+    settings.PICTURES = settings.PICTURES | {"RETRIES": 2}
+    monkeypatch.setattr(tasks.time, "sleep", Mock())
+    picture = Mock()
+    picture.save.side_effect = OSError("broken storage")
+    with pytest.raises(OSError):
+        tasks._save_picture(picture, Mock())
+    assert picture.save.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        ValueError("unsupported mode"),
+        UnidentifiedImageError("corrupt"),
+        FileNotFoundError("missing"),
+    ],
+)
+def test_save_picture__deterministic_error(monkeypatch, settings, error):
+    settings.PICTURES = settings.PICTURES | {"RETRIES": 2}
+    sleep = Mock()
+    monkeypatch.setattr(tasks.time, "sleep", sleep)
+    picture = Mock()
+    picture.save.side_effect = error
+    with pytest.raises(type(error)):
+        tasks._save_picture(picture, Mock())
+    assert picture.save.call_count == 1
+    assert not sleep.called
+
+
+def test_save_picture__no_retries(monkeypatch):
+    monkeypatch.setattr(tasks.time, "sleep", Mock())
+    picture = Mock()
+    picture.save.side_effect = OSError("broken storage")
+    with pytest.raises(OSError):
+        tasks._save_picture(picture, Mock())
+    assert picture.save.call_count == 1
+
+
+@pytest.mark.django_db
+def test_process_picture__resume_from_checkpoint(
+    monkeypatch, settings, image_upload_file
+):
+    settings.PICTURES = settings.PICTURES | {"RETRIES": 0}
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    storage, file_name, new, old = obj.picture.get_update_payload()
+    failing = obj.picture.aspect_ratios["16/9"]["AVIF"][100]
+    save = PillowPicture.save
+    saved = []
+    failures = [OSError("flaky storage")]
+
+    def flaky_save(picture, image):
+        saved.append(picture)
+        if picture == failing and failures:
+            raise failures.pop()
+        save(picture, image)
+
+    monkeypatch.setattr(PillowPicture, "save", flaky_save)
+    with pytest.raises(OSError):
+        tasks._process_picture(storage, file_name, new, old)
+    assert len(saved) == len(new)
+    assert len(state.get_checkpoint(storage, file_name, new)) == len(new) - 1
+
+    saved.clear()
+    tasks._process_picture(storage, file_name, new, old)
+    assert saved == [failing]
+    assert not state.get_checkpoint(storage, file_name, new)
+
+
+@pytest.mark.django_db
+def test_process_picture__task_deadline(caplog, settings, image_upload_file):
+    settings.PICTURES = settings.PICTURES | {
+        "USE_PLACEHOLDERS": False,
+        "STATE_CACHE": "default",
+    }
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    for picture in obj.picture.get_picture_files_list():
+        picture.delete()
+    cache.clear()
+    storage, file_name, new, old = obj.picture.get_update_payload()
+    settings.PICTURES = settings.PICTURES | {"TASK_DEADLINE": 0.000001}
+    processed = []
+
+    def receiver(sender, **kwargs):
+        processed.append(kwargs["status"])
+
+    signals.picture_processed.connect(receiver)
+    try:
+        tasks._dispatch(
+            lambda queue_name, **kwargs: tasks._process_picture(**kwargs),
+            storage,
+            file_name,
+            new,
+            old,
+        )
+    finally:
+        signals.picture_processed.disconnect(receiver)
+    assert not any(
+        picture.path.exists() for picture in obj.picture.get_picture_files_list()
+    )
+    assert (
+        "0 pictures were saved with faster encoder settings, 24 pictures were skipped."
+        in caplog.text
+    )
+    assert processed == [state.DEGRADED]
+    assert state.get_status(storage, file_name) == state.DEGRADED
+    assert obj.picture.get_ready_file_types() == set()
+    html = picture_tag(obj.picture, ratio="16/9")
+    assert "<source" not in html
+    assert f'src="/media/{file_name}"' in html
+
+    # processing the file again, e.g. via process_many, restores it
+    settings.PICTURES = settings.PICTURES | {"TASK_DEADLINE": None}
+    tasks._process_picture(storage, file_name, new, old)
+    assert state.get_status(storage, file_name) == state.READY
+    assert obj.picture.get_ready_file_types() == {"AVIF"}
+    assert 'type="image/avif"' in picture_tag(obj.picture, ratio="16/9")
+
+
+@pytest.mark.django_db
+def test_process_picture__task_deadline__fan_out(settings, image_upload_file):
+    settings.PICTURES = settings.PICTURES | {
+        "FAN_OUT": "file_type",
+        "STATE_CACHE": "default",
+    }
+    obj = JPEGModel.objects.create(picture=image_upload_file)
+    cache.clear()
+    storage, file_name, new, old = obj.picture.get_update_payload()
+    calls = []
+    tasks._dispatch(
+        lambda queue_name, **kwargs: calls.append(kwargs), storage, file_name, new, old
+    )
+    settings.PICTURES = settings.PICTURES | {"TASK_DEADLINE": 0.000001}
+    tasks._process_picture(**calls[0])
+    settings.PICTURES = settings.PICTURES | {"TASK_DEADLINE": None}
+    for kwargs in calls[1:]:
+        tasks._process_picture(**kwargs)
+    assert state.get_status(storage, file_name) == state.DEGRADED
+    skipped_file_type = calls[0]["new"][0][1][1]
+    assert obj.picture.get_ready_file_types() == (
+        {"WEBP", "JPEG"} - {skipped_file_type}
+    )
+
+
+@pytest.mark.django_db
+def test_process_picture__picture_deadline(
+    caplog, monkeypatch, settings, image_upload_file
+):
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    settings.PICTURES = settings.PICTURES | {"PICTURE_DEADLINE": 0.000001}
+    save = PillowPicture.save
+    params = []
+
+    def spy_save(picture, image, **kwargs):
+        params.append(kwargs)
+        save(picture, image, **kwargs)
+
+    monkeypatch.setattr(PillowPicture, "save", spy_save)
+    tasks._process_picture(*obj.picture.get_update_payload())
+    assert params[0] == {}
+    assert params[1:] == [{"speed": 10}] * 23
+    assert (
+        "23 pictures were saved with faster encoder settings, 0 pictures were skipped."
+        in caplog.text
+    )
+
+
+class TestThreadPool:
+    @pytest.fixture(autouse=True)
+    def thread_pool(self):
+        tasks.shutdown()
+        yield
+        tasks.shutdown()
+
+    @pytest.mark.django_db
+    def test_threaded_process_picture(self, image_upload_file):
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        picture = obj.picture.aspect_ratios["16/9"]["AVIF"][100]
+        picture.delete()
+        tasks.threaded_process_picture(*obj.picture.get_update_payload())
+        tasks.shutdown()
+        assert picture.path.exists()
+
+    @pytest.mark.django_db
+    def test_threaded_process_picture__queue_full(
+        self, monkeypatch, settings, image_upload_file
+    ):
+        settings.PICTURES = settings.PICTURES | {
+            "THREAD_POOL_SIZE": 1,
+            "THREAD_QUEUE_SIZE": 0,
+        }
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        payload = obj.picture.get_update_payload()
+        event = threading.Event()
+        monkeypatch.setattr(
+            tasks, "_process_picture_in_thread", lambda *args: event.wait(5)
+        )
+        process_picture = Mock()
+        monkeypatch.setattr(tasks, "_process_picture", process_picture)
+        assert tasks._submit(*payload)
+        tasks.threaded_process_picture(*payload)
+        process_picture.assert_called_once_with(*payload)
+        event.set()
+
+    @pytest.mark.django_db
+    def test_aprocess_picture(self, image_upload_file):
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        picture = obj.picture.aspect_ratios["16/9"]["AVIF"][100]
+        picture.delete()
+        asyncio.run(tasks.aprocess_picture(*obj.picture.get_update_payload()))
+        assert picture.path.exists()
+
+    @pytest.mark.django_db
+    def test_aprocess_picture__pending(self, monkeypatch, settings, image_upload_file):
+        settings.PICTURES = settings.PICTURES | {"STATE_CACHE": "default"}
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        statuses = []
+        monkeypatch.setattr(
+            tasks,
+            "_process_picture_in_thread",
+            lambda storage, file_name, *args: statuses.append(
+                state.get_status(storage, file_name)
+            ),
+        )
+        set_pending = tasks._set_pending
+
+        def _set_pending(*args):
+            # the cache isn't accessed on the event loop
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()
+            set_pending(*args)
+
+        monkeypatch.setattr(tasks, "_set_pending", _set_pending)
+        asyncio.run(tasks.aprocess_picture(*obj.picture.get_update_payload()))
+        assert statuses == [state.PENDING]
+
+    @pytest.mark.django_db
+    def test_aprocess_picture__queue_full(
+        self, monkeypatch, settings, image_upload_file
+    ):
+        settings.PICTURES = settings.PICTURES | {
+            "THREAD_POOL_SIZE": 1,
+            "THREAD_QUEUE_SIZE": 0,
+        }
+        obj = SimpleModel.objects.create(picture=image_upload_file)
+        picture = obj.picture.aspect_ratios["16/9"]["AVIF"][100]
+        picture.delete()
+        payload = obj.picture.get_update_payload()
+        event = threading.Event()
+        tasks._get_executor()[0].submit(event.wait, 5)
+        tasks._get_executor()[1].acquire()
+        asyncio.run(tasks.aprocess_picture(*payload))
+        assert picture.path.exists()
+        event.set()
@@ -1,5 +1,7 @@
 import pytest
+from django.core.cache import cache
 
+from pictures import metrics, state
 from pictures.templatetags.pictures import img_url, picture
 from tests.testapp.models import Profile
 
@@ -40,6 +42,16 @@ def test_picture(client, image_upload_file, settings):
     assert picture_html in response.content
 
 
+@pytest.mark.django_db
+def test_picture__metrics(image_upload_file):
+    metrics.REGISTRY.reset()
+    profile = Profile.objects.create(name="Spiderman", picture=image_upload_file)
+    picture(profile.picture, img_alt="Spiderman")
+    img_url(profile.picture, ratio="3/2", file_type="avif", width=800)
+    assert metrics.template_renders.get_count(tag="picture") == 1
+    assert metrics.template_renders.get_count(tag="img_url") == 1
+
+
 @pytest.mark.django_db
 def test_picture__large(client, large_image_upload_file, settings):
     settings.PICTURES = settings.PICTURES | {"USE_PLACEHOLDERS": False}
@@ -119,6 +131,50 @@ def test_picture__field_defaults(image_upload_file):
     )
 
 
+@pytest.mark.django_db
+def test_picture__deferred_file_types(monkeypatch, image_upload_file, settings):
+    settings.PICTURES = settings.PICTURES | {
+        "USE_PLACEHOLDERS": False,
+        "STATE_CACHE": "default",
+    }
+    field = Profile.picture.field
+    monkeypatch.setattr(field, "file_types", ["WEBP", "AVIF"])
+    monkeypatch.setattr(field, "deferred_file_types", ["AVIF"])
+    profile = Profile.objects.create(name="Spiderman", picture=image_upload_file)
+    html = picture(profile.picture, ratio="3/2")
+    assert 'type="image/webp"' in html
+    assert 'type="image/avif"' in html
+
+    cache.clear()
+    for pic in profile.picture.get_picture_files_list():
+        if pic.file_type == "AVIF":
+            pic.delete()
+    html = picture(profile.picture, ratio="3/2")
+    assert 'type="image/webp"' in html
+    assert 'type="image/avif"' not in html
+
+
+@pytest.mark.django_db
+def test_picture__pending(image_upload_file, settings):
+    settings.PICTURES = settings.PICTURES | {
+        "USE_PLACEHOLDERS": False,
+        "STATE_CACHE": "default",
+    }
+    cache.clear()
+    profile = Profile.objects.create(name="Spiderman", picture=image_upload_file)
+    state.set_pending(
+        profile.picture.storage.deconstruct(), profile.picture.name, [{"AVIF"}]
+    )
+    html = picture(profile.picture, img_alt="Spiderman")
+    assert "<source" not in html
+    assert 'src="/media/testapp/profile/image.png"' in html
+    assert (
+        img_url(profile.picture, ratio="3/2", file_type="avif", width="800")
+        == "/media/testapp/profile/image.png"
+    )
+    cache.clear()
+
+
 @pytest.mark.django_db
 def test_img_url(image_upload_file):
     profile = Profile.objects.create(name="Spiderman", picture=image_upload_file)
@@ -0,0 +1,173 @@
+import datetime
+from unittest.mock import Mock
+
+import pytest
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+from pictures import url_cache
+from pictures.models import PillowPicture
+from tests.testapp.models import SimpleModel
+
+
+def get_storage(**attrs):
+    storage = Mock(spec=["url", "deconstruct", *attrs])
+    storage.url.side_effect = lambda name: f"/media/{name}?signature=123"
+    storage.deconstruct.return_value = ("tests.Storage", (), attrs)
+    for attr, value in attrs.items():
+        setattr(storage, attr, value)
+    return storage
+
+
+@pytest.fixture(autouse=True)
+def enable_url_cache(settings):
+    settings.PICTURES = settings.PICTURES | {
+        "USE_PLACEHOLDERS": False,
+        "URL_CACHE_TIMEOUT": 3600,
+    }
+
+
+class TestGetTimeout:
+    def test_unsigned(self):
+        assert url_cache.get_timeout(default_storage) == 3600
+        assert (
+            url_cache.get_timeout(
+                get_storage(querystring_auth=False, querystring_expire=60)
+            )
+            == 3600
+        )
+
+    def test_querystring_expire(self):
+        assert url_cache.get_timeout(get_storage(querystring_expire=600)) == 300
+        assert url_cache.get_timeout(get_storage(querystring_expire=86400)) == 3600
+
+    def test_expiration__timedelta(self):
+        assert (
+            url_cache.get_timeout(
+                get_storage(expiration=datetime.timedelta(minutes=10))
+            )
+            == 300
+        )
+
+
+def test_is_signed():
+    assert not url_cache.is_signed(default_storage)
+    assert not url_cache.is_signed(
+        get_storage(querystring_auth=False, querystring_expire=60)
+    )
+    assert url_cache.is_signed(get_storage(querystring_expire=60))
+    assert url_cache.is_signed(get_storage(expiration_secs=60))
+
+
+class TestGetUrl:
+    def test_memoize(self):
+        storage = get_storage()
+        for _ in range(2):
+            assert (
+                url_cache.get_url(storage, "image.jpg", "image/800w.avif")
+                == "/media/image/800w.avif?signature=123"
+            )
+        assert storage.url.call_count == 1
+        url_cache.get_url(storage, "image.jpg", "image/400w.avif")
+        assert storage.url.call_count == 2
+
+    def test_expired(self, monkeypatch):
+        storage = get_storage(querystring_expire=600)
+        monkeypatch.setattr("time.time", lambda: 0)
+        url_cache.get_url(storage, "image.jpg", "image/800w.avif")
+        monkeypatch.setattr("time.time", lambda: 299)
+        url_cache.get_url(storage, "image.jpg", "image/800w.avif")
+        assert storage.url.call_count == 1
+        monkeypatch.setattr("time.time", lambda: 300)
+        url_cache.get_url(storage, "image.jpg", "image/800w.avif")
+        assert storage.url.call_count == 2
+
+    def test_max_size(self, monkeypatch):
+        monkeypatch.setattr(url_cache, "MAX_SIZE", 2)
+        storage = get_storage()
+        for parent_name in ["a.jpg", "b.jpg", "c.jpg"]:
+            url_cache.get_url(storage, parent_name, "800w.avif")
+        assert (storage, "a.jpg") not in url_cache._urls
+        assert (storage, "c.jpg") in url_cache._urls
+
+    def test_shared(self, settings):
+        settings.PICTURES = settings.PICTURES | {"URL_CACHE": "default"}
+        cache.clear()
+        storage = get_storage()
+        url_cache.get_url(storage, "image.jpg", "image/800w.avif")
+        url_cache._urls.clear()
+        assert (
+            url_cache.get_url(storage, "image.jpg", "image/800w.avif")
+            == "/media/image/800w.avif?signature=123"
+        )
+        assert storage.url.call_count == 1
+
+    def test_batch(self, settings, monkeypatch):
+        settings.PICTURES = settings.PICTURES | {"URL_CACHE": "default"}
+        cache.clear()
+        storage = get_storage()
+        set_ = Mock(wraps=cache.set)
+        monkeypatch.setattr(cache, "set", set_)
+        with url_cache.batch():
+            with url_cache.batch():
+                for width in [400, 800, 1200]:
+                    url_cache.get_url(storage, "image.jpg", f"image/{width}w.avif")
+            set_.assert_not_called()
+        set_.assert_called_once()
+        url_cache._urls.clear()
+        assert (
+            url_cache.get_url(storage, "image.jpg", "image/1200w.avif")
+            == "/media/image/1200w.avif?signature=123"
+        )
+        assert storage.url.call_count == 3
+
+    def test_prefetch(self, settings, monkeypatch):
+        settings.PICTURES = settings.PICTURES | {"URL_CACHE": "default"}
+        cache.clear()
+        storage = get_storage()
+        for parent_name in ["a.jpg", "b.jpg"]:
+            url_cache.get_url(storage, parent_name, "800w.avif")
+        url_cache._urls.clear()
+        get_many = Mock(wraps=cache.get_many)
+        monkeypatch.setattr(cache, "get_many", get_many)
+        url_cache.prefetch(storage, ["a.jpg", "b.jpg", "c.jpg"])
+        get_many.assert_called_once()
+        assert (storage, "a.jpg") in url_cache._urls
+        assert (storage, "c.jpg") not in url_cache._urls
+        url_cache.get_url(storage, "b.jpg", "800w.avif")
+        assert storage.url.call_count == 2
+
+    def test_invalidate(self, settings):
+        settings.PICTURES = settings.PICTURES | {"URL_CACHE": "default"}
+        cache.clear()
+        storage = get_storage()
+        url_cache.get_url(storage, "image.jpg", "image/800w.avif")
+        url_cache.invalidate(storage, "image.jpg")
+        url_cache.get_url(storage, "image.jpg", "image/800w.avif")
+        assert storage.url.call_count == 2
+
+
+def test_picture_url(monkeypatch):
+    url = Mock(return_value="/media/image.avif")
+    monkeypatch.setattr(default_storage, "url", url)
+    for _ in range(2):
+        picture = PillowPicture(
+            parent_name="image.png",
+            file_type="AVIF",
+            aspect_ratio=None,
+            storage=default_storage,
+            width=800,
+        )
+        assert picture.url == "/media/image.avif"
+    assert url.call_count == 1
+
+
+@pytest.mark.django_db
+def test_update_all__invalidate(stub_worker, image_upload_file, monkeypatch):
+    obj = SimpleModel.objects.create(picture=image_upload_file)
+    invalidate = Mock()
+    monkeypatch.setattr(url_cache, "invalidate", invalidate)
+    obj.picture.update_all()
+    invalidate.assert_called_once_with(obj.picture.storage, obj.picture.name)
+    obj.picture.delete_all()
+    assert invalidate.call_count == 2
@@ -1,3 +1,5 @@
+from unittest.mock import Mock
+
 import pytest
 from django.core.files.storage import Storage, default_storage
 
@@ -137,6 +139,39 @@ class TestSourceSet:
             600,
         }
 
+    def test_fractional_widths(self):
+        # 1000px / 12 columns are no whole numbers
+        assert utils.source_set((400, 400), ratio=None, max_width=1000, cols=12) == {
+            83,
+            166,
+            250,
+            333,
+        }
+
+    def test_pixel_densities(self, settings):
+        settings.PICTURES = settings.PICTURES | {"PIXEL_DENSITIES": [1]}
+        assert utils.source_set((800, 600), ratio=3 / 2, max_width=1200, cols=12) == {
+            100,
+            200,
+            300,
+            400,
+            500,
+            600,
+            700,
+            800,
+        }
+
+    def test_cache_info(self):
+        utils.source_set((321, 123), ratio=None, max_width=1200, cols=12)
+        info = utils.source_set.cache_info()
+        utils.source_set((321, 123), ratio=None, max_width=1200, cols=12)
+        assert utils.source_set.cache_info().hits == info.hits + 1
+        assert utils.source_set.cache_info().misses == info.misses
+
+    @pytest.mark.benchmark(group="pictures.utils.source_set")
+    def test_source_set__performance(self, benchmark):
+        benchmark(utils.source_set, (6000, 4000), ratio="16/9", max_width=1200, cols=12)
+
 
 def test_placeholder():
     utils.placeholder.cache_clear()
@@ -180,3 +215,53 @@ def test_reconstruct(image_upload_file):
         default_storage,
         100,
     )
+
+
+def test_reconstruct__memo():
+    memo = {}
+    storage = utils.reconstruct(*default_storage.deconstruct(), memo=memo)
+    assert utils.reconstruct(*default_storage.deconstruct(), memo=memo) is storage
+    assert utils.reconstruct(*default_storage.deconstruct()) is not storage
+
+
+class TestLazyMapping:
+    def test_getitem(self):
+        factory = Mock(side_effect=lambda key: key * 2)
+        mapping = utils.LazyMapping([3, 1, 2], factory)
+        assert mapping[1] == 2
+        assert mapping[1] == 2
+        factory.assert_called_once_with(1)
+        with pytest.raises(KeyError):
+            mapping[4]
+        with pytest.raises(TypeError):
+            mapping[[]]
+
+    def test_iter(self):
+        mapping = utils.LazyMapping([3, 1, 2], lambda key: key * 2)
+        assert list(mapping) == [3, 1, 2]
+        assert len(mapping) == 3
+        assert 1 in mapping
+        assert 4 not in mapping
+        assert mapping == {3: 6, 1: 2, 2: 4}
+        assert repr(mapping) == "{3: 6, 1: 2, 2: 4}"
+
+    def test_read_only(self):
+        mapping = utils.LazyMapping([1], lambda key: key)
+        with pytest.raises(TypeError):
+            mapping[1] = 2
+
+
+def test_batched():
+    assert list(utils.batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(utils.batched([], 2)) == []
+
+
+def test_size_queue_name(settings):
+    assert utils.size_queue_name(10**9) is None
+    settings.PICTURES = settings.PICTURES | {
+        "SIZE_QUEUES": {"pictures-large": 10**8, "pictures-huge": 10**9}
+    }
+    assert utils.size_queue_name(10**7) is None
+    assert utils.size_queue_name(10**8) == "pictures-large"
+    assert utils.size_queue_name(10**9 - 1) == "pictures-large"
+    assert utils.size_queue_name(10**10) == "pictures-huge"
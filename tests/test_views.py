@@ -1,7 +1,8 @@
 import pytest
 from django.http import Http404
 
-from pictures.views import placeholder
+from pictures import metrics
+from pictures.views import export_metrics, placeholder
 
 
 def test_placeholder(rf):
@@ -20,3 +21,12 @@ def test_placeholder__invalid_file_type(rf):
     with pytest.raises(Http404) as e:
         placeholder(rf.get("/"), 400, "4x3", "gif", "amazing_img")
     assert "File type not allowed" in str(e.value)
+
+
+def test_export_metrics(rf):
+    metrics.REGISTRY.reset()
+    placeholder(rf.get("/"), 400, "4x3", "avif", "amazing_img")
+    response = export_metrics(rf.get("/"))
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+    assert "pictures_placeholder_render_seconds_count 1.0\n" in response.text